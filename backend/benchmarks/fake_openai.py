@@ -0,0 +1,126 @@
+"""
+Minimal OpenAI-compatible chat completions server for benchmarks.
+
+Answers POST /v1/chat/completions after a configurable delay, with or
+without streaming. Requests with a JSON schema response_format and area
+scoring prompts from /init get a JSON object that rates the areas; every
+other prompt gets a short text.
+
+Run standalone and point the backend at it:
+
+    python benchmarks/fake_openai.py --port 9100 --latency 0.5
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_KEY=fake python app.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+REPLY = "Let's start by listing the three processes that cost your team the most time each week."
+
+# Configured by create_app
+settings = {"latency": 0.5, "token_delay": 0.02, "jitter": 0.1}
+
+_AREAS_RE = re.compile(r"The focus areas are: (.*?)\. Return only", re.DOTALL)
+
+
+def completion_text(messages, response_format=None) -> str:
+    schema = ((response_format or {}).get("json_schema") or {}).get("schema") or {}
+    if schema.get("type") == "object":
+        return json.dumps({name: random.randint(0, 100) for name in schema.get("properties", {})})
+    system = messages[0]["content"] if messages and isinstance(messages[0].get("content"), str) else ""
+    match = _AREAS_RE.search(system)
+    if match:
+        areas = [a.strip() for a in match.group(1).split(", ") if a.strip()]
+        return json.dumps({area: random.randint(0, 100) for area in areas})
+    return REPLY
+
+
+def usage(messages, text):
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(text) // 4,
+        "total_tokens": prompt_tokens + len(text) // 4,
+    }
+
+
+async def simulated_latency():
+    jitter = settings["jitter"] * settings["latency"]
+    await asyncio.sleep(max(0.0, settings["latency"] + random.uniform(-jitter, jitter)))
+
+
+app = FastAPI(title="Fake OpenAI")
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "gpt-4o")
+    text = completion_text(messages, body.get("response_format"))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await simulated_latency()
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": usage(messages, text),
+        }
+
+    async def chunks():
+        await simulated_latency()
+        for word in re.findall(r"\S+\s*", text):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(settings["token_delay"])
+        done = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+def create_app(latency: float = 0.5, token_delay: float = 0.02, jitter: float = 0.1) -> FastAPI:
+    settings.update(latency=latency, token_delay=token_delay, jitter=jitter)
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between streamed chunks")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Relative latency jitter")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.token_delay, args.jitter), host=args.host, port=args.port, log_level="warning")
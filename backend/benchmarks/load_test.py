@@ -0,0 +1,308 @@
+"""
+End-to-end load and latency benchmark for the backend.
+
+Seeds a throwaway SQLite database from the bundled CSV, starts the fake
+OpenAI server and the backend under uvicorn, and drives concurrent virtual
+users through the real flow:
+
+    /register -> /token -> /init -> /message (x turns) -> /info_person
+
+Per-endpoint p50/p95/p99 latency, error counts and throughput are written
+as JSON, so runs on different commits can be compared:
+
+    python benchmarks/load_test.py --users 20 --duration 60 --output before.json
+    python benchmarks/load_test.py --users 20 --duration 60 --output after.json --compare before.json
+
+Pass --target to benchmark an already running server instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_CSV = os.path.join(BACKEND_DIR, "START Hack 25_Canton of St.Gallen_dataset innovation ecosystem_enriched_new.csv")
+
+PROBLEMS = [
+    ("Managing Director", "Our customers leave for cheaper competitors and we do not know why."),
+    ("CEO", "We want to use our production data to predict machine failures."),
+    ("Head of Operations", "Energy costs in our factory doubled and we need to become more sustainable."),
+    ("CTO", "Our software is outdated and we struggle to hire developers."),
+    ("Founder", "We need funding and partners to bring a medical device to market."),
+]
+USER_TURNS = [
+    "Where should we start?",
+    "We have a small team and limited budget.",
+    "Who could help us with a first pilot?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(len(values) * p / 100 + 0.5)) - 1)]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def wait_until_up(url: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class Stack:
+    """
+    Seeded database, fake OpenAI server and backend running as subprocesses.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.processes: List[subprocess.Popen] = []
+        self.workdir = tempfile.mkdtemp(prefix="load_test_")
+        self.base_url = None
+
+    def __enter__(self):
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(self.workdir, 'bench.db')}"
+        env["PYTHONUNBUFFERED"] = "1"
+        subprocess.run(
+            [sys.executable, "import_innovation_data.py", SEED_CSV, "--bulk"],
+            cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+
+        llm_port = free_port()
+        self._start(
+            [sys.executable, os.path.join("benchmarks", "fake_openai.py"), "--port", str(llm_port),
+             "--latency", str(self.args.llm_latency), "--token-delay", str(self.args.token_delay)],
+            env,
+        )
+        wait_until_up(f"http://127.0.0.1:{llm_port}/docs")
+
+        env["OPENAI_API_KEY"] = "fake"
+        env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{llm_port}/v1"
+        app_port = free_port()
+        self._start(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--workers", str(self.args.workers), "--log-level", "warning"],
+            env,
+        )
+        self.base_url = f"http://127.0.0.1:{app_port}"
+        wait_until_up(self.base_url + "/ready")
+        return self
+
+    def _start(self, command, env):
+        log = open(os.path.join(self.workdir, f"process{len(self.processes)}.log"), "w")
+        self.processes.append(subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=log))
+
+    def __exit__(self, *exc):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.flows = 0
+
+    async def call(self, name: str, coro):
+        started = time.perf_counter()
+        try:
+            response = await coro
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        return response
+
+
+async def virtual_user(client: httpx.AsyncClient, recorder: Recorder, deadline: float, turns: int):
+    while time.time() < deadline:
+        username = f"vu_{uuid.uuid4().hex[:12]}"
+        password = "benchmark-password"
+        role, problem = random.choice(PROBLEMS)
+
+        if not await recorder.call("/register", client.post("/register", json={"username": username, "password": password})):
+            continue
+        token = await recorder.call("/token", client.post("/token", data={"username": username, "password": password}))
+        if not token:
+            continue
+        headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+        await recorder.call("/me", client.get("/me", headers=headers))
+
+        sliders = {"clue": random.randint(0, 100), "motivation": random.randint(0, 100), "confidence": random.randint(0, 100)}
+        init = await recorder.call("/init", client.get("/init", params={"role": role, "problem": problem, **sliders}))
+        if not init:
+            continue
+        areas = init.json()
+
+        messages = [{"role": "assistant", "content": "Hi, how can I help you today?"}]
+        start_data = {**sliders, "areas": areas}
+        for turn in USER_TURNS[:turns]:
+            messages.append({"role": "user", "content": turn})
+            reply = await recorder.call(
+                "/message", client.post("/message", json={"last_messages": messages, "start_data": start_data})
+            )
+            if not reply:
+                break
+            messages.append({"role": "assistant", "content": reply.json()["response"]})
+
+        contacts = [c for a in areas for c in a["area"]["contacts"]]
+        if contacts:
+            person = random.choice(contacts)
+            await recorder.call("/info_person", client.post("/info_person", json={
+                "person": {k: person.get(k) or "" for k in ("name", "description", "institution", "email", "website")},
+                "last_messages": messages,
+            }))
+        recorder.flows += 1
+
+
+async def run_load(base_url: str, users: int, duration: float, turns: int) -> Recorder:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        deadline = time.time() + duration
+        await asyncio.gather(*(virtual_user(client, recorder, deadline, turns) for _ in range(users)))
+    return recorder
+
+
+def summarize(recorder: Recorder, seconds: float, args) -> dict:
+    endpoints = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = recorder.latencies.get(name, [])
+        endpoints[name] = {
+            "count": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "throughput_rps": round(len(values) / seconds, 2),
+            "latency_ms": {
+                key: round(value * 1000, 2) if value is not None else None
+                for key, value in (
+                    ("p50", percentile(values, 50)),
+                    ("p95", percentile(values, 95)),
+                    ("p99", percentile(values, 99)),
+                    ("mean", sum(values) / len(values) if values else None),
+                    ("max", max(values) if values else None),
+                )
+            },
+        }
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "users": args.users,
+            "duration_s": args.duration,
+            "turns": args.turns,
+            "workers": args.workers,
+            "llm_latency_s": args.llm_latency,
+            "target": args.target,
+        },
+        "flows_completed": recorder.flows,
+        "flows_per_second": round(recorder.flows / seconds, 3),
+        "endpoints": endpoints,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """
+    Print latency changes against a baseline run.
+
+    Returns:
+        True if any endpoint's p95 got slower by more than `threshold` percent
+    """
+    regressed = False
+    print(f"{'endpoint':<14}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}")
+    for name, stats in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        cells = []
+        for key in ("p50", "p95", "p99"):
+            old, new = before["latency_ms"][key], stats["latency_ms"][key]
+            if not old or new is None:
+                cells.append("n/a")
+                continue
+            change = (new - old) / old * 100
+            cells.append(f"{new:.1f} ({change:+.0f}%)")
+            if key == "p95" and change > threshold:
+                regressed = True
+        print(f"{name:<14}" + "".join(f"{c:>18}" for c in cells))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load")
+    parser.add_argument("--turns", type=int, default=2, help="/message calls per flow")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the backend")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM latency in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Fake LLM delay between streamed chunks")
+    parser.add_argument("--target", help="Base URL of a running backend; skips starting the stack")
+    parser.add_argument("--output", default="load_test_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed p95 slowdown in percent with --compare")
+    args = parser.parse_args()
+
+    def run(base_url):
+        started = time.perf_counter()
+        recorder = asyncio.run(run_load(base_url, args.users, args.duration, args.turns))
+        return summarize(recorder, time.perf_counter() - started, args)
+
+    if args.target:
+        results = run(args.target)
+    else:
+        with Stack(args) as stack:
+            results = run(stack.base_url)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(json.load(f), results, args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Login throughput benchmark for the bcrypt password pool.
+
+Fires a storm of password verifications at one worker process and reports
+verifications (logins) per second, rejected attempts and event loop lag,
+i.e. how long other requests would stall during the storm. "inline" runs
+bcrypt on the event loop like the handlers used to, "pool" uses
+verify_password_async.
+
+Run from the backend directory:
+
+    python benchmarks/password_throughput.py --logins 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwordUtil import (  # noqa: E402
+    PASSWORD_QUEUE_LIMIT, PASSWORD_WORKERS, PasswordPoolBusyError,
+    hash_password, verify_password, verify_password_async,
+)
+
+TICK = 0.01
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list):
+    # A healthy loop wakes up every TICK; anything beyond that is lag
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def storm(mode: str, logins: int, hashed: bytes):
+    stop = asyncio.Event()
+    lags = []
+    probe = asyncio.create_task(measure_loop_lag(stop, lags))
+    await asyncio.sleep(TICK)
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        if mode == "inline":
+            verify_password("secret", hashed)
+            # Yield like a request handler returning would
+            await asyncio.sleep(0)
+            return
+        try:
+            await verify_password_async("secret", hashed)
+        except PasswordPoolBusyError:
+            rejected += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    lags.sort()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "accepted": logins - rejected,
+        "rejected": rejected,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round((logins - rejected) / elapsed, 1),
+        "loop_lag_ms": {
+            "p50": round(lags[len(lags) // 2] * 1000, 2) if lags else None,
+            "max": round(lags[-1] * 1000, 2) if lags else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100, help="Concurrent login attempts per run")
+    args = parser.parse_args()
+
+    hashed = hash_password("secret")
+    results = {
+        "cpu_count": os.cpu_count(),
+        "password_workers": PASSWORD_WORKERS,
+        "queue_limit": PASSWORD_QUEUE_LIMIT,
+        "runs": [asyncio.run(storm(mode, args.logins, hashed)) for mode in ("inline", "pool")],
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Latency benchmark for the FTS5 expert search.
+
+Builds a throwaway database with a synthetic catalog, rebuilds the
+full-text index and times `search.search_experts` for a mix of queries.
+Descriptions are drawn from the words of the bundled dataset plus generated
+words, with Zipf-distributed frequencies like natural text (the dataset
+alone has only a few hundred distinct words, which would make every word
+match a large share of the catalog). Prints JSON
+with the index build time and per-query p50/p95 latency:
+
+    python benchmarks/search_latency.py --experts 100000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--experts", type=int, default=100000, help="Number of synthetic experts")
+parser.add_argument("--areas", type=int, default=200, help="Number of synthetic areas")
+parser.add_argument("--vocabulary", type=int, default=20000, help="Distinct words in descriptions")
+parser.add_argument("--repeat", type=int, default=200, help="Runs per query")
+args = parser.parse_args()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_CSV = os.path.join(BACKEND_DIR, "START Hack 25_Canton of St.Gallen_dataset innovation ecosystem_enriched_new.csv")
+
+# Point createDB at a fresh database before it is imported
+db_dir = tempfile.mkdtemp(prefix="search_latency_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'search.db')}"
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import insert  # noqa: E402
+
+from createDB import ExpertAreas, Experts, InnovationAreas, SessionLocal  # noqa: E402
+from search import rebuild_expert_search_index, search_experts  # noqa: E402
+
+QUERIES = ["data", "machine learning", "sustainab", "st gallen", "robot autom", "health digital", "zzzz"]
+
+
+def vocabulary():
+    words, areas = set(), set()
+    with open(SEED_CSV, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            words.update(re.findall(r"[A-Za-z]{3,}", f"{row['Description']} {row['Institution']}"))
+            areas.update(a.strip() for a in (row["Focus Areas"] or "").split(",") if a.strip())
+    return sorted(words), sorted(areas)
+
+
+def zipf_words(rng, seed_words):
+    syllables = ["ka", "lo", "mi", "ne", "ru", "ta", "vi", "zo", "ber", "gen", "tor", "lin", "pra", "sol"]
+    generated = set()
+    while len(generated) < max(0, args.vocabulary - len(seed_words)):
+        generated.add("".join(rng.choices(syllables, k=rng.randint(2, 4))))
+    words = list(seed_words) + sorted(generated)
+    rng.shuffle(words)
+    weights = [1 / (rank + 1) ** 1.07 for rank in range(len(words))]
+    return words, weights
+
+
+def seed(db, rng):
+    seed_words, seed_areas = vocabulary()
+    words, weights = zipf_words(rng, seed_words)
+    area_names = (seed_areas + [f"Area {i}" for i in range(args.areas)])[:args.areas]
+    db.execute(insert(InnovationAreas), [
+        {"innovation_area_id": i + 1, "innovation_area_name": name} for i, name in enumerate(area_names)
+    ])
+    experts, links = [], []
+    for expert_id in range(1, args.experts + 1):
+        experts.append({
+            "expert_id": expert_id,
+            "expert_name": f"{rng.choice(words)} {rng.choice(words)}",
+            "expert_description": " ".join(rng.choices(words, weights, k=rng.randint(10, 40))),
+            "expert_institution": " ".join(rng.choices(words, weights, k=3)),
+            "expert_email": f"expert{expert_id}@example.com",
+            "expert_website": "",
+        })
+        for area_id in rng.sample(range(1, len(area_names) + 1), 3):
+            links.append({"expert_id": expert_id, "area_id": area_id})
+    db.execute(insert(Experts), experts)
+    db.execute(insert(ExpertAreas), links)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    rng = random.Random(0)
+    db = SessionLocal()
+    seed(db, rng)
+    started = time.perf_counter()
+    rebuild_expert_search_index(db.connection())
+    db.commit()
+    build_seconds = time.perf_counter() - started
+
+    conn = db.connection()
+    results = {}
+    for query in QUERIES:
+        search_experts(conn, query)  # warm up
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            hits = search_experts(conn, query)
+            timings.append((time.perf_counter() - started) * 1000)
+        results[query] = {
+            "hits": len(hits),
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+        }
+    db.close()
+    print(json.dumps({
+        "experts": args.experts,
+        "areas": args.areas,
+        "vocabulary": args.vocabulary,
+        "index_build_s": round(build_seconds, 2),
+        "queries": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
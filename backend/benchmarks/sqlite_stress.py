@@ -0,0 +1,141 @@
+"""
+Concurrent read/write stress test for the SQLite setup.
+
+Reader threads look up users by name in a loop while writers insert new
+users, either through the serialized writer or directly from several
+threads. Read latency percentiles and errors such as "database is locked"
+are printed as JSON.
+
+Run from the backend directory against a throwaway database:
+
+    SQLITE_MODE=production python benchmarks/sqlite_stress.py
+    SQLITE_MODE=default python benchmarks/sqlite_stress.py --direct-writes
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--readers", type=int, default=8, help="Number of reader threads")
+parser.add_argument("--writes", type=int, default=500, help="Number of users to insert")
+parser.add_argument("--write-concurrency", type=int, default=8, help="Concurrent write submissions")
+parser.add_argument("--direct-writes", action="store_true", help="Write from several threads instead of the serialized writer")
+args = parser.parse_args()
+
+# Point createDB at a fresh database before it is imported
+db_dir = tempfile.mkdtemp(prefix="sqlite_stress_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'stress.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from createDB import SQLITE_MODE, SessionLocal, ReadSessionLocal, User  # noqa: E402
+from db_writer import SerializedWriter  # noqa: E402
+
+# A precomputed hash keeps bcrypt out of the measurement
+HASHED_PASSWORD = "$2b$12$C6UzMDM.H6dfI/f/IKcEeO5FRpXWQ2pZoE1Q1zYw9M0ZpFg0Q5q9W"
+
+
+def insert_user(db, username):
+    db.add(User(username=username, hashed_password=HASHED_PASSWORD))
+    db.commit()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else None
+
+
+def reader(stop, latencies, errors):
+    db = ReadSessionLocal()
+    i = 0
+    try:
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                db.query(User).filter(User.username == f"user{i % max(args.writes, 1)}").first()
+                db.rollback()
+            except Exception as e:
+                errors.append(str(e).splitlines()[0])
+                db.rollback()
+            latencies.append(time.perf_counter() - started)
+            i += 1
+    finally:
+        db.close()
+
+
+async def write_serialized(errors):
+    writer = SerializedWriter()
+    semaphore = asyncio.Semaphore(args.write_concurrency)
+
+    async def one(i):
+        async with semaphore:
+            try:
+                await writer.submit(insert_user, f"user{i}")
+            except Exception as e:
+                errors.append(str(e).splitlines()[0])
+
+    await asyncio.gather(*(one(i) for i in range(args.writes)))
+    writer.shutdown()
+
+
+def write_direct(errors):
+    def worker(offset):
+        for i in range(offset, args.writes, args.write_concurrency):
+            db = SessionLocal()
+            try:
+                insert_user(db, f"user{i}")
+            except Exception as e:
+                errors.append(str(e).splitlines()[0])
+                db.rollback()
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.write_concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def main():
+    stop = threading.Event()
+    latencies, read_errors, write_errors = [], [], []
+    readers = [threading.Thread(target=reader, args=(stop, latencies, read_errors)) for _ in range(args.readers)]
+    for t in readers:
+        t.start()
+
+    started = time.perf_counter()
+    if args.direct_writes:
+        write_direct(write_errors)
+    else:
+        asyncio.run(write_serialized(write_errors))
+    write_seconds = time.perf_counter() - started
+
+    stop.set()
+    for t in readers:
+        t.join()
+
+    print(json.dumps({
+        "sqlite_mode": SQLITE_MODE,
+        "writer": "direct" if args.direct_writes else "serialized",
+        "writes": args.writes,
+        "write_errors": len(write_errors),
+        "writes_per_second": round(args.writes / write_seconds, 1),
+        "reads": len(latencies),
+        "read_errors": len(read_errors),
+        "read_latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        },
+        "error_samples": sorted(set(read_errors + write_errors))[:3],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Import and startup time of the backend.
+
+Imports `app` in fresh interpreters with `python -X importtime` and reports
+the median import time plus the modules that cost the most. Then starts the
+backend under uvicorn (stub LLM backend, throwaway database seeded from the
+bundled CSV) and measures how long it takes until it answers /ready at all,
+and until /ready reports that warm-up has finished. Prints JSON:
+
+    python benchmarks/startup_time.py --repeat 5
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+parser.add_argument("--top", type=int, default=10, help="Number of most expensive imports to list")
+parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for /ready")
+args = parser.parse_args()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_CSV = "START Hack 25_Canton of St.Gallen_dataset innovation ecosystem_enriched_new.csv"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_importtime(stderr: str):
+    """
+    Parse `-X importtime` output into (cumulative us, module, depth) rows.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative), name.strip(), depth))
+    return rows
+
+
+def measure_import(env):
+    totals, costs, modules = [], {}, set()
+    for _ in range(args.repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app"],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        rows = parse_importtime(result.stderr)
+        app_depth = next(depth for _, name, depth in rows if name == "app")
+        totals.append(next(us for us, name, _ in rows if name == "app"))
+        # Direct imports of app, with everything they pulled in
+        for us, name, depth in rows:
+            modules.add(name)
+            if depth == app_depth + 1:
+                costs.setdefault(name, []).append(us)
+    top = sorted(((statistics.median(us), name) for name, us in costs.items()), reverse=True)[:args.top]
+    return {
+        "import_app_ms": round(statistics.median(totals) / 1000, 1),
+        "heaviest_imports_ms": {name: round(us / 1000, 1) for us, name in top},
+        # Deferred to first use; importing them with the app means something regressed
+        "deferred_imported": sorted({"openai", "numpy"} & modules),
+    }
+
+
+def measure_startup(env):
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first_answer = ready = None
+    body = None
+    try:
+        while time.perf_counter() - started < args.timeout:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1)
+                body = response.json()
+                if first_answer is None:
+                    first_answer = time.perf_counter() - started
+                if response.status_code == 200:
+                    ready = time.perf_counter() - started
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.02)
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "first_answer_s": round(first_answer, 2) if first_answer is not None else None,
+        "ready_s": round(ready, 2) if ready is not None else None,
+        "ready": body,
+    }
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="startup_time_")
+    try:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+        env["LLM_BACKEND"] = "stub"
+        env.pop("OPENAI_API_KEY", None)
+        subprocess.run(
+            [sys.executable, "import_innovation_data.py", SEED_CSV, "--bulk"],
+            cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+        results = measure_import(env)
+        startups = [measure_startup(env) for _ in range(args.repeat)]
+        results["first_answer_s"] = statistics.median(s["first_answer_s"] for s in startups)
+        results["ready_s"] = statistics.median(s["ready_s"] for s in startups)
+        results["ready"] = startups[-1]["ready"]
+        print(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Memory per worker and query latency of the memory-mapped vector index.
+
+For every catalog size, builds a float32 and an int8 index of a synthetic
+catalog (descriptions with Zipf-distributed word frequencies), then starts
+--workers processes that open it like the app's workers do and run queries:
+
+- `mmap`: the arrays are memory-mapped read-only (what the app does), so all
+  workers share one copy in the page cache
+- `copy`: every worker loads the arrays into its own memory, for comparison
+
+Once all workers have run their queries, each reports its RSS, PSS
+(shared pages divided among the processes that map them) and private
+memory from /proc/self/smaps_rollup (Linux only). Prints JSON:
+
+    python benchmarks/vector_index_memory.py --experts 10000,100000,1000000 --workers 4
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--experts", default="10000,100000,1000000", help="Comma-separated catalog sizes")
+parser.add_argument("--areas", type=int, default=200, help="Number of synthetic areas")
+parser.add_argument("--workers", type=int, default=4, help="Worker processes per run")
+parser.add_argument("--modes", default="mmap,copy", help="Comma-separated: mmap, copy")
+parser.add_argument("--dim", type=int, default=256, help="Embedding dimensions")
+parser.add_argument("--queries", type=int, default=200, help="Area top-3 queries per worker")
+parser.add_argument("--scans", type=int, default=20, help="Full-catalog nearest-neighbour queries per worker")
+parser.add_argument("--worker", help=argparse.SUPPRESS)
+parser.add_argument("--mode", help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# catalog imports createDB; keep it away from the real database
+work_dir = tempfile.mkdtemp(prefix="vector_index_memory_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'unused.db')}"
+
+import numpy as np  # noqa: E402
+
+# Importing createDB prints migration progress; keep stdout for the results
+with contextlib.redirect_stdout(sys.stderr):
+    from catalog import CatalogSnapshot, ExpertRecord, area_names_fingerprint  # noqa: E402
+    from vector_index import VectorIndex, build_vector_index  # noqa: E402
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vi", "zo", "ber", "gen", "tor", "lin", "pra", "sol"]
+
+
+def vocabulary(rng, size=20000):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    cum_weights, total = [], 0.0
+    for rank in range(len(words)):
+        total += 1 / (rank + 1) ** 1.07
+        cum_weights.append(total)
+    return words, cum_weights
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def memory_kb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_mb": round(fields["Rss"] / 1024, 1),
+        "pss_mb": round(fields["Pss"] / 1024, 1),
+        "private_mb": round((fields["Private_Clean"] + fields["Private_Dirty"]) / 1024, 1),
+    }
+
+
+def run_worker():
+    """
+    One worker: open the index, run queries, report memory when told to.
+    """
+    started = time.perf_counter()
+    index = VectorIndex.open(args.worker)
+    if args.mode == "copy":
+        for name in ("expert_ids", "experts", "expert_scales", "areas", "area_ptr", "area_rows", "idf", "projection"):
+            value = getattr(index, name)
+            if value is not None:
+                setattr(index, name, np.array(value))
+    open_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(os.getpid())
+    words, cum_weights = vocabulary(random.Random(0))
+    area_ids = list(index.area_row_of)
+    area_ms, scan_ms = [], []
+    for i in range(args.queries + args.scans):
+        query = index.embed(" ".join(rng.choices(words, cum_weights=cum_weights, k=12)))
+        started = time.perf_counter()
+        if i < args.queries:
+            index.area_top_k(rng.choice(area_ids), query, 3)
+            area_ms.append((time.perf_counter() - started) * 1000)
+        else:
+            index.nearest(query, 3)
+            scan_ms.append((time.perf_counter() - started) * 1000)
+
+    print("ready", flush=True)
+    sys.stdin.readline()
+    print(json.dumps({
+        "open_ms": round(open_ms, 2),
+        "area_top3_ms": area_ms,
+        "scan_top3_ms": scan_ms,
+        **memory_kb(),
+    }), flush=True)
+    sys.stdin.read()
+
+
+def synthetic_snapshot(n_experts, rng):
+    words, cum_weights = vocabulary(rng)
+    area_names = tuple(f"Area {i}" for i in range(args.areas))
+    experts, area_experts = {}, {i + 1: [] for i in range(args.areas)}
+    for expert_id in range(1, n_experts + 1):
+        experts[expert_id] = ExpertRecord(
+            expert_id=expert_id,
+            expert_name=f"{rng.choice(words)} {rng.choice(words)}",
+            expert_description=" ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(10, 40))),
+            expert_institution=" ".join(rng.choices(words, cum_weights=cum_weights, k=3)),
+            expert_email=None,
+            expert_website=None,
+        )
+        for area_id in rng.sample(range(1, args.areas + 1), 3):
+            area_experts[area_id].append(expert_id)
+    return CatalogSnapshot(
+        version=1,
+        loaded_at=time.time(),
+        fingerprint=area_names_fingerprint(area_names),
+        area_names=area_names,
+        area_ids={name: i + 1 for i, name in enumerate(area_names)},
+        area_experts={area_id: tuple(ids) for area_id, ids in area_experts.items()},
+        experts=experts,
+    )
+
+
+def run_workers(index_dir, mode):
+    workers = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", index_dir, "--mode", mode,
+             "--queries", str(args.queries), "--scans", str(args.scans)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        if worker.stdout.readline().strip() != "ready":
+            raise RuntimeError("Worker exited before running its queries")
+    # Measure while every worker is alive, so shared pages are split between all of them
+    reports = []
+    for worker in workers:
+        worker.stdin.write("go\n")
+        worker.stdin.flush()
+        reports.append(json.loads(worker.stdout.readline()))
+    for worker in workers:
+        worker.stdin.close()
+        worker.wait()
+
+    area_ms = [t for r in reports for t in r["area_top3_ms"]]
+    scan_ms = [t for r in reports for t in r["scan_top3_ms"]]
+    return {
+        "workers": args.workers,
+        "open_ms": max(r["open_ms"] for r in reports),
+        "rss_mb_per_worker": round(sum(r["rss_mb"] for r in reports) / len(reports), 1),
+        "pss_mb_per_worker": round(sum(r["pss_mb"] for r in reports) / len(reports), 1),
+        "private_mb_per_worker": round(sum(r["private_mb"] for r in reports) / len(reports), 1),
+        "pss_mb_total": round(sum(r["pss_mb"] for r in reports), 1),
+        "area_top3_p50_ms": round(percentile(area_ms, 50), 3) if area_ms else None,
+        "area_top3_p95_ms": round(percentile(area_ms, 95), 3) if area_ms else None,
+        "scan_top3_p50_ms": round(percentile(scan_ms, 50), 2) if scan_ms else None,
+        "scan_top3_p95_ms": round(percentile(scan_ms, 95), 2) if scan_ms else None,
+    }
+
+
+def main():
+    results = []
+    try:
+        for n_experts in [int(n) for n in args.experts.split(",")]:
+            snapshot = synthetic_snapshot(n_experts, random.Random(0))
+            builds = {}
+            for quantize in (False, True):
+                root = os.path.join(work_dir, f"{n_experts}-{'int8' if quantize else 'float32'}")
+                started = time.perf_counter()
+                version_dir = build_vector_index(snapshot, root, dim=args.dim, quantize=quantize)
+                builds[quantize] = (version_dir, time.perf_counter() - started)
+            del snapshot
+
+            for quantize, (version_dir, build_seconds) in builds.items():
+                matrix_bytes = os.path.getsize(os.path.join(version_dir, "experts.npy"))
+                result = {
+                    "experts": n_experts,
+                    "dtype": "int8" if quantize else "float32",
+                    "build_s": round(build_seconds, 1),
+                    "matrix_mb": round(matrix_bytes / 2 ** 20, 1),
+                }
+                for mode in args.modes.split(","):
+                    result[mode] = run_workers(os.path.dirname(version_dir), mode)
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr, flush=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(json.dumps({"dim": args.dim, "areas": args.areas, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    if args.worker:
+        try:
+            run_worker()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    else:
+        main()
@@ -0,0 +1,203 @@
+"""
+Throughput of the backend under gunicorn with 1 to N workers.
+
+Seeds a throwaway database, then for every worker count starts gunicorn with
+gunicorn.conf.py (stub LLM backend, local rankers, so /init is CPU-bound and
+needs no network), waits until the workers are ready and sends /init and
+/experts/search requests from --users concurrent clients for --duration
+seconds. Reports requests per second, latency, the speedup over one worker
+and the memory of the master and workers (PSS, where shared pages are split
+between the processes that map them; Linux only). Prints JSON:
+
+    python benchmarks/worker_scaling.py --workers 1,2,4 --users 32 --duration 20
+
+The load generator runs on the same machine, so leave it a core: scaling
+flattens out once the workers and the clients compete for the same cores.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import httpx
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--workers", default=None, help="Comma-separated worker counts (default: 1, 2, 4, ... up to the cores)")
+parser.add_argument("--users", type=int, default=32, help="Concurrent clients")
+parser.add_argument("--duration", type=float, default=20, help="Seconds of load per worker count")
+parser.add_argument("--no-preload", action="store_true", help="Let every worker import the app and load the catalog itself")
+args = parser.parse_args()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_CSV = "START Hack 25_Canton of St.Gallen_dataset innovation ecosystem_enriched_new.csv"
+
+PROBLEMS = [
+    "We need AI and machine learning for our production data",
+    "Sustainable energy and recycling in construction",
+    "Digital health records for small clinics",
+    "Corporate strategy for entering new markets",
+    "Robotics and automation on the shop floor",
+]
+SEARCHES = ["data", "machine learn", "sustainab", "health digital", "robot"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def default_worker_counts() -> List[int]:
+    cores = len(os.sched_getaffinity(0))
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def child_pids(pid: int) -> List[int]:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def memory_mb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "pss": fields["Pss"] / 1024,
+        "private": (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024,
+    }
+
+
+def wait_until_ready(base_url: str, workers: int, timeout: float = 120):
+    # Requests land on whichever worker accepts first, so ask until enough
+    # answers in a row say ready
+    deadline = time.time() + timeout
+    in_a_row = 0
+    while time.time() < deadline:
+        try:
+            in_a_row = in_a_row + 1 if httpx.get(base_url + "/ready", timeout=2).status_code == 200 else 0
+        except httpx.HTTPError:
+            in_a_row = 0
+        if in_a_row >= 4 * workers:
+            return
+        time.sleep(0.05)
+    raise RuntimeError(f"{base_url} did not become ready within {timeout}s")
+
+
+async def client(http: httpx.AsyncClient, deadline: float, latencies: List[float], errors: List[str], seed: int):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        if rng.random() < 0.5:
+            url, params = "/init", {
+                "role": "CEO", "problem": rng.choice(PROBLEMS), "clue": 1, "motivation": 2, "confidence": 3,
+            }
+        else:
+            url, params = "/experts/search", {"q": rng.choice(SEARCHES)}
+        started = time.perf_counter()
+        try:
+            response = await http.get(url, params=params)
+            if response.status_code != 200:
+                errors.append(str(response.status_code))
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run_load(base_url: str):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(client(http, deadline, latencies, errors, i) for i in range(args.users)))
+        seconds = time.perf_counter() - started
+    return latencies, errors, seconds
+
+
+def measure(workers: int, env: dict) -> dict:
+    port = free_port()
+    env = dict(env, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}",
+               GUNICORN_PRELOAD="0" if args.no_preload else "1")
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning", "app:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, workers)
+        latencies, errors, seconds = asyncio.run(run_load(base_url))
+        memory = [memory_mb(pid) for pid in child_pids(master.pid)]
+        master_memory = memory_mb(master.pid)
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait()
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / seconds, 1),
+        "p50_ms": round(percentile(latencies, 50), 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 1) if latencies else None,
+        "pss_mb_total": round(master_memory["pss"] + sum(m["pss"] for m in memory), 1),
+        "private_mb_per_worker": round(sum(m["private"] for m in memory) / len(memory), 1),
+    }
+
+
+def main():
+    counts = [int(n) for n in args.workers.split(",")] if args.workers else default_worker_counts()
+    workdir = tempfile.mkdtemp(prefix="worker_scaling_")
+    try:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'scaling.db')}"
+        env["LLM_BACKEND"] = "stub"
+        env["AREA_RANKER"] = "local"
+        env["CONTACT_RANKER"] = "relevance"
+        subprocess.run(
+            [sys.executable, "import_innovation_data.py", SEED_CSV, "--bulk"],
+            cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+        results = []
+        for workers in counts:
+            result = measure(workers, env)
+            result["speedup"] = round(result["rps"] / results[0]["rps"], 2) if results else 1.0
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr, flush=True)
+        print(json.dumps({
+            "cores": len(os.sched_getaffinity(0)),
+            "users": args.users,
+            "duration_s": args.duration,
+            "preload": not args.no_preload,
+            "results": results,
+        }, indent=2))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
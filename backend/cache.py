@@ -0,0 +1,255 @@
+"""
+Small LRU/TTL caches used by the API.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache whose entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] < time.monotonic():
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteCache:
+    """
+    Persistent LRU/TTL cache for JSON-serializable values, stored in its own
+    SQLite file so it survives restarts.
+
+    The connection is opened on first use in each process, so the cache can
+    be created before a preloading server forks its workers. Every call does
+    blocking file I/O, so async code goes through TieredCache.aget/aset.
+
+    Expired and least recently used entries are evicted every `evict_every`
+    sets, so the table may briefly hold up to `maxsize + evict_every - 1`
+    entries. Hits are remembered in memory and written to `accessed_at`
+    right before an eviction, the only place that reads it.
+    """
+
+    def __init__(self, path: str, maxsize: int, ttl: float, table: str = "cache", evict_every: int = 100):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.table = table
+        self.path = path
+        self.evict_every = evict_every
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        # Sets since the last eviction, and key -> time of hits not written yet
+        self._sets = 0
+        self._accessed: Dict[str, float] = {}
+        # Process that opened the connection; forked workers open their own
+        self._pid: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed_at ON {self.table} (accessed_at)"
+            )
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.table}_expires_at ON {self.table} (expires_at)"
+            )
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.misses += 1
+                return default
+            self._accessed[key] = now
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + (ttl or self.ttl), now),
+            )
+            self._accessed.pop(key, None)
+            self._sets += 1
+            if self._sets >= self.evict_every:
+                self._evict(now)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._accessed.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._accessed.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def _evict(self, now: float):
+        self._sets = 0
+        if self._accessed:
+            self._conn.executemany(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+        overflow = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.maxsize
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TieredCache:
+    """
+    In-memory LRU in front of an optional persistent SQLite tier.
+
+    Hits in the persistent tier are promoted to memory.
+    """
+
+    def __init__(self, memory: TTLCache, persistent: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is _MISSING and self.persistent is not None:
+            value = self.persistent.get(key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+        return self._count(value, default)
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        """
+        Same as get, with the persistent tier read in the threadpool.
+        """
+        value = self.memory.get(key, _MISSING)
+        if value is _MISSING and self.persistent is not None:
+            value = await run_in_threadpool(self.persistent.get, key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+        return self._count(value, default)
+
+    def _count(self, value: Any, default: Any) -> Any:
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    async def aset(self, key: str, value: Any):
+        """
+        Same as set, with the persistent tier written in the threadpool.
+        """
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            await run_in_threadpool(self.persistent.set, key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats() if self.persistent is not None else None,
+        }
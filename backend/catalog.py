@@ -0,0 +1,162 @@
+"""
+In-process snapshot of the expert catalog.
+
+Innovation areas, experts and their links only change when
+import_innovation_data runs, so the API serves them from memory instead of
+querying SQLite on every request. A snapshot is immutable; reloading builds
+a new one and swaps the reference, so requests that already hold the old
+snapshot finish undisturbed.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from createDB import ReadSessionLocal, InnovationAreas, Experts, ExpertAreas
+
+
+@dataclass(frozen=True)
+class ExpertRecord:
+    expert_id: int
+    expert_name: str
+    expert_description: str
+    expert_institution: str
+    expert_email: str
+    expert_website: str
+
+
+def area_names_fingerprint(area_names) -> str:
+    """
+    Stable hash of the area list, identical across processes and restarts.
+    """
+    return hashlib.sha256("\n".join(area_names).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    loaded_at: float
+    # Hash of area_names, used to key caches that outlive the process
+    fingerprint: str
+    # Area names in database order
+    area_names: Tuple[str, ...]
+    # Area name -> area id
+    area_ids: Dict[str, int]
+    # Area id -> ids of the linked experts, ascending
+    area_experts: Dict[int, Tuple[int, ...]]
+    # Expert id -> expert
+    experts: Dict[int, ExpertRecord]
+
+    def top_experts(self, area_name: str, limit: int = 3) -> Optional[Tuple[int, List[ExpertRecord]]]:
+        """
+        Get the first experts of an area.
+
+        Returns:
+            (number of experts linked to the area, first `limit` experts by
+            id), or None if the area does not exist
+        """
+        area_id = self.area_ids.get(area_name)
+        if area_id is None:
+            return None
+        expert_ids = self.area_experts.get(area_id, ())
+        return len(expert_ids), [self.experts[e] for e in expert_ids[:limit] if e in self.experts]
+
+
+def load_catalog(db: Session, version: int) -> CatalogSnapshot:
+    """
+    Read the whole catalog from the database into a snapshot.
+    """
+    areas = db.query(InnovationAreas.innovation_area_id, InnovationAreas.innovation_area_name).all()
+    experts = {
+        row.expert_id: ExpertRecord(
+            expert_id=row.expert_id,
+            expert_name=row.expert_name,
+            expert_description=row.expert_description,
+            expert_institution=row.expert_institution,
+            expert_email=row.expert_email,
+            expert_website=row.expert_website,
+        )
+        for row in db.query(
+            Experts.expert_id,
+            Experts.expert_name,
+            Experts.expert_description,
+            Experts.expert_institution,
+            Experts.expert_email,
+            Experts.expert_website,
+        )
+    }
+    postings: Dict[int, List[int]] = {}
+    for expert_id, area_id in db.query(ExpertAreas.expert_id, ExpertAreas.area_id).order_by(
+        ExpertAreas.area_id, ExpertAreas.expert_id
+    ):
+        postings.setdefault(area_id, []).append(expert_id)
+
+    area_ids = {}
+    for area_id, name in areas:
+        # Keep the first id if a name is duplicated, like .first() did
+        area_ids.setdefault(name, area_id)
+
+    area_names = tuple(name for _, name in areas)
+    return CatalogSnapshot(
+        version=version,
+        loaded_at=time.time(),
+        fingerprint=area_names_fingerprint(area_names),
+        area_names=area_names,
+        area_ids=area_ids,
+        area_experts={area_id: tuple(ids) for area_id, ids in postings.items()},
+        experts=experts,
+    )
+
+
+class CatalogCache:
+    """
+    Holds the current catalog snapshot and loads it on first access.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> CatalogSnapshot:
+        """
+        Get the current snapshot, loading it from the database if needed.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load(version=1)
+                snapshot = self._snapshot
+        return snapshot
+
+    def reload(self, db: Optional[Session] = None) -> CatalogSnapshot:
+        """
+        Load a fresh snapshot and make it the current one.
+
+        Args:
+            db: Session to read from; a new one is opened if omitted
+        """
+        with self._lock:
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            self._snapshot = self._load(version, db)
+            return self._snapshot
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._snapshot.version if self._snapshot else None
+
+    @staticmethod
+    def _load(version: int, db: Optional[Session] = None) -> CatalogSnapshot:
+        if db is not None:
+            return load_catalog(db, version)
+        db = ReadSessionLocal()
+        try:
+            return load_catalog(db, version)
+        finally:
+            db.close()
+
+
+catalog = CatalogCache()
@@ -0,0 +1,194 @@
+"""
+Token-budgeted context compaction for chat conversations.
+
+Every /message call used to send the whole conversation, so prompts (and
+latency) grew with every turn. The compactor keeps the prompt under a token
+budget: once the conversation does not fit anymore, older turns are folded
+into a rolling summary and only the summary plus the most recent turns are
+sent. Summaries are cached per conversation and extended incrementally, so
+the model is asked to summarize only every few turns, and usually in the
+background before the budget is actually reached.
+"""
+import asyncio
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from cache import TTLCache
+
+# Rough BPE approximation: words are split every few characters and every
+# punctuation mark is a token. Errs on the high side for English text.
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+# Tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# summarize(previous summary or None, turns to fold in) -> new summary
+Summarizer = Callable[[Optional[str], List[Dict[str, str]]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text without calling a tokenizer.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """
+    Estimate the prompt tokens of a list of chat messages.
+    """
+    return sum(MESSAGE_OVERHEAD_TOKENS + estimate_tokens(str(m.get("content") or "")) for m in messages)
+
+
+def turns_digest(turns: List[Dict[str, str]]) -> str:
+    payload = json.dumps([[t.get("role"), t.get("content")] for t in turns], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class ConversationSummary:
+    # Number of leading turns the summary covers, and their digest
+    covered: int
+    digest: str
+    text: str
+
+
+class ConversationCompactor:
+    """
+    Fits a conversation into a token budget using a rolling summary.
+    """
+
+    def __init__(
+        self,
+        summarize: Summarizer,
+        budget: int,
+        recent_turns: int,
+        cache: TTLCache,
+        prefetch_ratio: float = 0.75,
+    ):
+        """
+        Args:
+            summarize: Coroutine function that folds turns into a summary
+            budget: Maximum estimated prompt tokens
+            recent_turns: Turns that are always sent verbatim (if they fit)
+            cache: Summaries by conversation key
+            prefetch_ratio: Share of the budget above which the summary is
+                extended in the background
+        """
+        self.summarize = summarize
+        self.budget = budget
+        self.recent_turns = max(1, recent_turns)
+        self.cache = cache
+        self.prefetch_ratio = prefetch_ratio
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def _cached_summary(self, key: str, turns: List[Dict[str, str]]) -> Optional[ConversationSummary]:
+        summary = self.cache.get(key)
+        # The client may have edited or truncated the history since
+        if summary is None or summary.covered > len(turns) or summary.digest != turns_digest(turns[:summary.covered]):
+            return None
+        return summary
+
+    async def compact(
+        self,
+        prefix: List[Dict[str, str]],
+        turns: List[Dict[str, str]],
+        key: str,
+    ) -> List[Dict[str, str]]:
+        """
+        Build the messages for the model.
+
+        Once a prompt gets close to the budget, the summary is extended in the
+        background so the next turn usually does not wait for it.
+
+        Args:
+            prefix: Messages that are always sent (the system prompt)
+            turns: The conversation, oldest first
+            key: Identifies the conversation in the summary cache
+
+        Returns:
+            `prefix + turns` if that fits the budget, otherwise the prefix,
+            a system message with the summary of older turns, and the
+            recent turns
+        """
+        fixed = estimate_message_tokens(prefix)
+        total = fixed + estimate_message_tokens(turns)
+        if total <= self.budget:
+            if total > self.budget * self.prefetch_ratio:
+                self._fold_in_background(key, fixed, turns)
+            return prefix + turns
+
+        summary = self._cached_summary(key, turns)
+        window = turns[summary.covered if summary else 0:]
+        total = fixed + self._summary_tokens(summary) + estimate_message_tokens(window)
+        if total > self.budget:
+            try:
+                summary = await self._fold(key, fixed, turns, summary)
+            except Exception as e:
+                # Answering without the older turns beats not answering
+                print(f"Error summarizing conversation: {str(e)}")
+                window = window[len(window) - self._recent_that_fit(fixed, window):]
+                return prefix + self._summary_messages(summary) + window
+            window = turns[summary.covered if summary else 0:]
+        elif total > self.budget * self.prefetch_ratio:
+            self._fold_in_background(key, fixed, turns)
+
+        return prefix + self._summary_messages(summary) + window
+
+    async def _fold(
+        self,
+        key: str,
+        fixed: int,
+        turns: List[Dict[str, str]],
+        summary: Optional[ConversationSummary],
+    ) -> Optional[ConversationSummary]:
+        """
+        Fold everything but the recent turns into the summary and cache it.
+        """
+        covered = summary.covered if summary else 0
+        window = turns[covered:]
+        fold = window[:len(window) - self._recent_that_fit(fixed, window)]
+        if not fold:
+            return summary
+        text = await self.summarize(summary.text if summary else None, fold)
+        covered += len(fold)
+        summary = ConversationSummary(covered, turns_digest(turns[:covered]), text)
+        self.cache.set(key, summary)
+        return summary
+
+    def _fold_in_background(self, key: str, fixed: int, turns: List[Dict[str, str]]):
+        if key in self._pending:
+            return
+
+        async def fold():
+            try:
+                await self._fold(key, fixed, turns, self._cached_summary(key, turns))
+            except Exception as e:
+                print(f"Error summarizing conversation: {str(e)}")
+            finally:
+                self._pending.pop(key, None)
+
+        # Keep a reference, the event loop only holds weak ones
+        self._pending[key] = asyncio.ensure_future(fold())
+
+    def _recent_that_fit(self, fixed: int, window: List[Dict[str, str]]) -> int:
+        # Leave room for a summary about as long as one message
+        room = self.budget - fixed - MESSAGE_OVERHEAD_TOKENS - self.budget // 10
+        keep, used = 0, 0
+        for turn in reversed(window[-self.recent_turns:]):
+            used += estimate_message_tokens([turn])
+            if keep and used > room:
+                break
+            keep += 1
+        return keep
+
+    @staticmethod
+    def _summary_messages(summary: Optional[ConversationSummary]) -> List[Dict[str, str]]:
+        if summary is None:
+            return []
+        return [{"role": "system", "content": f"Summary of the earlier conversation: {summary.text}"}]
+
+    def _summary_tokens(self, summary: Optional[ConversationSummary]) -> int:
+        return estimate_message_tokens(self._summary_messages(summary))
@@ -0,0 +1,105 @@
+"""
+Server-side conversation sessions.
+
+Conversations (the /init result they are about and every message) are stored
+in SQLite, so clients only post the new message of each turn instead of the
+whole transcript. Recently used conversations are kept in an in-memory hot
+tier, so a turn normally reads nothing from the database and writes one
+batch of messages through the serialized writer.
+"""
+import asyncio
+import uuid
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from cache import TTLCache
+from createDB import ReadSessionLocal, append_conversation_messages, create_conversation, get_conversation
+from db_writer import SerializedWriter, db_writer
+
+
+class ConversationConflictError(Exception):
+    """
+    Raised when another worker appended to a conversation in the meantime.
+    """
+
+
+@dataclass
+class ConversationState:
+    conversation_id: str
+    start_data: Dict[str, Any]
+    messages: List[Dict[str, str]] = field(default_factory=list)
+
+
+class ConversationStore:
+    """
+    Conversations in SQLite with an in-memory hot tier.
+
+    Turns of the same conversation are serialized with a per-conversation
+    lock. The hot tier is per process; with several workers a stale copy is
+    detected when its append collides with the stored positions.
+    """
+
+    def __init__(
+        self,
+        cache: TTLCache,
+        writer: SerializedWriter = db_writer,
+        session_factory: sessionmaker = ReadSessionLocal,
+    ):
+        self.cache = cache
+        self.writer = writer
+        self.session_factory = session_factory
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def create(self, start_data: Dict[str, Any], messages: List[Dict[str, str]]) -> ConversationState:
+        state = ConversationState(uuid.uuid4().hex, start_data, list(messages))
+        await self.writer.submit(create_conversation, state.conversation_id, start_data, state.messages)
+        self.cache.set(state.conversation_id, state)
+        return state
+
+    async def get(self, conversation_id: str) -> Optional[ConversationState]:
+        state = self.cache.get(conversation_id)
+        if state is None:
+            state = await run_in_threadpool(self._load, conversation_id)
+            if state is not None:
+                self.cache.set(conversation_id, state)
+        return state
+
+    def _load(self, conversation_id: str) -> Optional[ConversationState]:
+        db = self.session_factory()
+        try:
+            stored = get_conversation(db, conversation_id)
+        finally:
+            db.close()
+        if stored is None:
+            return None
+        start_data, messages = stored
+        return ConversationState(conversation_id, start_data, messages)
+
+    def lock(self, conversation_id: str) -> asyncio.Lock:
+        """
+        Lock to hold while running a turn of a conversation.
+        """
+        lock = self._locks.get(conversation_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[conversation_id] = lock
+        return lock
+
+    async def append(self, state: ConversationState, messages: List[Dict[str, str]]):
+        """
+        Store new messages of a conversation and add them to its state.
+
+        Raises:
+            ConversationConflictError: If the stored conversation has moved on
+        """
+        try:
+            await self.writer.submit(append_conversation_messages, state.conversation_id, len(state.messages), messages)
+        except IntegrityError:
+            self.cache.delete(state.conversation_id)
+            raise ConversationConflictError(state.conversation_id)
+        state.messages.extend(messages)
@@ -1,14 +1,23 @@
 import json
-from sqlalchemy import Column, ForeignKey, Integer, PrimaryKeyConstraint, String, Boolean, DateTime, Date, create_engine, select
+import os
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy import Column, ForeignKey, Index, Integer, PrimaryKeyConstraint, String, Boolean, DateTime, Date, create_engine, select, func
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.pool import QueuePool
 import random
 
 from passwordUtil import hash_password
+from migrations import run_migrations
 
-DATABASE_URL = "sqlite:///./sqlite.db"  # Replace with your DB URL
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sqlite.db")
+# "production" turns on WAL journaling, busy timeouts and read-only reader connections
+SQLITE_MODE = os.getenv("SQLITE_MODE", "default")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
 Base = declarative_base()
 
 class User(Base):
@@ -30,6 +39,10 @@ class InnovationAreas(Base):
     __tablename__ = "innovation_areas"
     innovation_area_id = Column(Integer, primary_key=True, index=True)
     innovation_area_name = Column(String)
+    # Keep index names in sync with migrations.py
+    __table_args__ = (
+        Index("ux_innovation_areas_name", "innovation_area_name", unique=True),
+    )
 
 class Experts(Base):
     __tablename__ = "experts"
@@ -39,6 +52,9 @@ class Experts(Base):
     expert_institution = Column(String)
     expert_email = Column(String)
     expert_website = Column(String)
+    __table_args__ = (
+        Index("ix_experts_natural_key", "expert_name", "expert_institution", "expert_email"),
+    )
 
 class IdentifiedArea(Base):
     __tablename__ = "identified_areas"
@@ -53,11 +69,45 @@ class ExpertAreas(Base):
     __tablename__ = "expert_areas"
     expert_id = Column(Integer, ForeignKey('experts.expert_id'), primary_key=True)
     area_id = Column(Integer, ForeignKey('innovation_areas.innovation_area_id'), primary_key=True)
-    __table_args__ = (PrimaryKeyConstraint('expert_id', 'area_id'),)
+    __table_args__ = (
+        PrimaryKeyConstraint('expert_id', 'area_id'),
+        Index("ix_expert_areas_area_id", "area_id", "expert_id"),
+    )
 
+class Conversation(Base):
+    __tablename__ = "conversations"
+    conversation_id = Column(String, primary_key=True)
+    # JSON of the /init result the conversation is about
+    start_data = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
-def create_user(db: Session, username: str, password: str, email: str = "", company: str = "", role: str = "", company_sector: str = "", problem: str = "", profile: str = ""):
-    hashed_password = hash_password(password)  # Hash the password
+class ConversationMessage(Base):
+    __tablename__ = "conversation_messages"
+    conversation_id = Column(String, ForeignKey('conversations.conversation_id'))
+    position = Column(Integer)
+    role = Column(String)
+    content = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # The primary key doubles as the index for reading a conversation in order
+    __table_args__ = (
+        PrimaryKeyConstraint('conversation_id', 'position'),
+    )
+
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"
+    # Increases with every row, so workers can ask for everything after the last one they saw
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Which per-process cache is stale, see invalidations.py
+    cache = Column(String, nullable=False)
+    # Stale entry, or None for the whole cache
+    key = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+def create_user(db: Session, username: str, password: str = None, email: str = "", company: str = "", role: str = "", company_sector: str = "", problem: str = "", profile: str = "", hashed_password: bytes = None):
+    if hashed_password is None:
+        hashed_password = hash_password(password)  # Hash the password
     db_user = User(
         username=username,
         hashed_password=hashed_password,
@@ -79,27 +129,271 @@ def get_areas(db: Session, user_id: int):
     return areas
 
 def get_experts(db: Session, area_id: int):
-    experts = db.query(Experts).filter(Experts.expert_category == area_id).all()
+    experts = (
+        db.query(Experts)
+        .join(ExpertAreas, ExpertAreas.expert_id == Experts.expert_id)
+        .filter(ExpertAreas.area_id == area_id)
+        .all()
+    )
     return experts
 
+def get_top_experts_by_area(db: Session, area_names: List[str], limit: int = 3) -> Dict[str, Tuple[int, List[Experts]]]:
+    """
+    Get the first experts of several areas in a single query.
+
+    A window function numbers the experts of every area and counts them, so
+    only `limit` experts per area are loaded no matter how many are linked.
+
+    Args:
+        db: Database session
+        area_names: Names of the areas to look up
+        limit: Maximum number of experts per area
+
+    Returns:
+        Mapping from area name to (number of experts linked to the area,
+        first `limit` experts ordered by id). Unknown areas are left out.
+    """
+    if not area_names:
+        return {}
+
+    ranked = (
+        select(
+            ExpertAreas.area_id,
+            ExpertAreas.expert_id,
+            func.row_number().over(
+                partition_by=ExpertAreas.area_id, order_by=ExpertAreas.expert_id
+            ).label("position"),
+            func.count().over(partition_by=ExpertAreas.area_id).label("expert_count"),
+        )
+        .join(InnovationAreas, InnovationAreas.innovation_area_id == ExpertAreas.area_id)
+        .where(InnovationAreas.innovation_area_name.in_(area_names))
+        .subquery()
+    )
+    rows = db.execute(
+        select(InnovationAreas.innovation_area_name, ranked.c.expert_count, Experts)
+        .join(ranked, ranked.c.area_id == InnovationAreas.innovation_area_id)
+        .join(Experts, Experts.expert_id == ranked.c.expert_id)
+        .where(ranked.c.position <= limit)
+        .order_by(ranked.c.area_id, ranked.c.position)
+    ).all()
+
+    experts_by_area = {}
+    for area_name, expert_count, expert in rows:
+        experts_by_area.setdefault(area_name, (expert_count, []))[1].append(expert)
+    return experts_by_area
+
 def get_experts_by_user(db: Session, user_id: int):
-    areas = get_areas(db, user_id)
-    experts = []
-    for area in areas:
-        experts += get_experts(db, area.innovation_area_id)
+    """
+    Get the experts of all areas identified for a user in a single query.
+
+    An expert linked to several of the user's areas is returned once per area.
+    """
+    experts = (
+        db.query(Experts)
+        .join(ExpertAreas, ExpertAreas.expert_id == Experts.expert_id)
+        .join(IdentifiedArea, IdentifiedArea.areas_id == ExpertAreas.area_id)
+        .filter(IdentifiedArea.user_id == user_id)
+        .order_by(ExpertAreas.area_id, Experts.expert_id)
+        .all()
+    )
     return experts
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=10,  # Increase the pool size
-    max_overflow=20,  # Increase the overflow size
-    pool_timeout=30,  # Increase the timeout period
-    poolclass=QueuePool
-)
+def create_conversation(db: Session, conversation_id: str, start_data: Dict, messages: List[Dict[str, str]]):
+    now = datetime.utcnow()
+    db.add(Conversation(
+        conversation_id=conversation_id,
+        start_data=json.dumps(start_data),
+        created_at=now,
+        updated_at=now,
+    ))
+    db.flush()
+    _add_conversation_messages(db, conversation_id, 0, messages, now)
+    db.commit()
+
+def append_conversation_messages(db: Session, conversation_id: str, position: int, messages: List[Dict[str, str]]):
+    """
+    Append messages to a conversation, the first one at `position`.
+
+    Raises IntegrityError if another writer already used one of the positions.
+    """
+    now = datetime.utcnow()
+    _add_conversation_messages(db, conversation_id, position, messages, now)
+    db.query(Conversation).filter(Conversation.conversation_id == conversation_id).update({"updated_at": now})
+    db.commit()
+
+def _add_conversation_messages(db: Session, conversation_id: str, position: int, messages: List[Dict[str, str]], now: datetime):
+    if messages:
+        db.execute(ConversationMessage.__table__.insert(), [
+            {
+                "conversation_id": conversation_id,
+                "position": position + i,
+                "role": m["role"],
+                "content": m["content"],
+                "created_at": now,
+            }
+            for i, m in enumerate(messages)
+        ])
+
+def get_conversation(db: Session, conversation_id: str) -> Optional[Tuple[Dict, List[Dict[str, str]]]]:
+    """
+    Get the start data and the messages (in order) of a conversation.
+
+    Returns:
+        (start_data, messages), or None if the conversation does not exist
+    """
+    conversation = db.get(Conversation, conversation_id)
+    if conversation is None:
+        return None
+    rows = db.execute(
+        select(ConversationMessage.role, ConversationMessage.content)
+        .where(ConversationMessage.conversation_id == conversation_id)
+        .order_by(ConversationMessage.position)
+    ).all()
+    return json.loads(conversation.start_data), [{"role": role, "content": content} for role, content in rows]
+
+def record_cache_invalidation(db: Session, cache: str, key: Optional[str] = None, retention: Optional[timedelta] = None):
+    """
+    Tell every process that a cache entry (or a whole cache) is stale. Does
+    not commit, so the row lands in the same transaction as the change.
+
+    Args:
+        retention: Also delete rows older than this
+    """
+    db.add(CacheInvalidation(cache=cache, key=key))
+    if retention is not None:
+        db.query(CacheInvalidation).filter(
+            CacheInvalidation.created_at < datetime.utcnow() - retention
+        ).delete(synchronize_session=False)
+
+def get_cache_invalidations(db: Session, after_id: int) -> List[Tuple[int, str, Optional[str]]]:
+    """
+    Get the invalidations recorded after `after_id`, oldest first.
+
+    Returns:
+        (id, cache, key) rows
+    """
+    rows = db.execute(
+        select(CacheInvalidation.id, CacheInvalidation.cache, CacheInvalidation.key)
+        .where(CacheInvalidation.id > after_id)
+        .order_by(CacheInvalidation.id)
+    ).all()
+    return [tuple(row) for row in rows]
+
+def get_last_cache_invalidation_id(db: Session) -> int:
+    return db.execute(select(func.max(CacheInvalidation.id))).scalar() or 0
+
+def read_only_url(url: str) -> str:
+    """
+    Turn a file-based SQLite URL into one that opens the database read-only.
+    """
+    path = os.path.abspath(make_url(url).database)
+    return f"sqlite:///file:{path}?mode=ro&uri=true"
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.close()
+
+class _LazySessionmaker(sessionmaker):
+    """
+    sessionmaker that sets up the database before the first session.
+    """
+
+    def __call__(self, **local_kw) -> Session:
+        init_db()
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+# Sessions for request handlers that only read; writes go through db_writer
+ReadSessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+
+_engines: Optional[Tuple[Engine, Engine]] = None
+_engines_lock = threading.Lock()
+
+def init_db() -> Tuple[Engine, Engine]:
+    """
+    Create the engines and bring the schema up to date, once per process.
+
+    Nothing touches the database when this module is imported; this runs on
+    first use of `engine`, `read_engine` or a session.
+
+    Returns:
+        (engine, read_engine); they are the same engine unless SQLITE_MODE
+        is "production"
+    """
+    global _engines
+    if _engines is None:
+        with _engines_lock:
+            if _engines is None:
+                _engines = _create_engines()
+    return _engines
+
+def _create_engines() -> Tuple[Engine, Engine]:
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=10,  # Increase the pool size
+        max_overflow=20,  # Increase the overflow size
+        pool_timeout=30,  # Increase the timeout period
+        poolclass=QueuePool
+    )
+
+    if SQLITE_MODE == "production":
+        # Readers get their own pool of read-only connections; in WAL mode they
+        # never wait for the writer
+        read_engine = create_engine(
+            read_only_url(DATABASE_URL),
+            pool_size=10,
+            max_overflow=20,
+            pool_timeout=30,
+            poolclass=QueuePool
+        )
+    else:
+        read_engine = engine
+
+    if SQLITE_MODE == "production":
+        event.listen(engine, "connect", _configure_sqlite_connection)
+        if read_engine is not engine:
+            event.listen(read_engine, "connect", _configure_sqlite_connection)
+
+    SessionLocal.configure(bind=engine)
+    ReadSessionLocal.configure(bind=read_engine)
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    if SQLITE_MODE == "production":
+        # WAL is persistent, so switching once on the write engine is enough
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+    return engine, read_engine
+
+def dispose_engines(close: bool = True):
+    """
+    Drop the pooled connections of both engines; new ones are opened on demand.
+
+    Args:
+        close: Close the connections. A forked child passes False, because
+            the connections still belong to the parent process
+    """
+    if _engines is None:
+        return
+    engine, read_engine = _engines
+    engine.dispose(close=close)
+    if read_engine is not engine:
+        read_engine.dispose(close=close)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# A forked worker (gunicorn --preload, multiprocessing) must not share the
+# parent's SQLite connections
+os.register_at_fork(after_in_child=lambda: dispose_engines(close=False))
 
-Base.metadata.create_all(bind=engine)
+def __getattr__(name: str):
+    # `from createDB import engine` keeps working, and creates the engine then
+    if name == "engine":
+        return init_db()[0]
+    if name == "read_engine":
+        return init_db()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     # delete_schedule(SessionLocal(), 474313)
@@ -0,0 +1,58 @@
+"""
+Serialized writer for the SQLite database.
+
+SQLite allows only one writer at a time. Instead of letting request handlers
+race for the write lock (and fail with "database is locked"), every write is
+submitted to a single dedicated thread with its own session. Writes run one
+after another, while readers keep using their own connections.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from createDB import SessionLocal
+
+
+class SerializedWriter:
+    """
+    Runs write functions one at a time on a dedicated thread.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+    async def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run `fn(db, *args, **kwargs)` on the writer thread and wait for it.
+
+        The function gets a fresh session and is responsible for committing.
+        The session is rolled back if the function raises.
+        """
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context over, like run_in_threadpool (used by sql_profiler)
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, partial(self._run, fn, args, kwargs))
+
+    def _run(self, fn: Callable[..., Any], args, kwargs) -> Any:
+        db: Session = self.session_factory()
+        try:
+            return fn(db, *args, **kwargs)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def shutdown(self):
+        """
+        Wait for queued writes to finish and stop the writer thread.
+        """
+        self._executor.shutdown(wait=True)
+
+
+db_writer = SerializedWriter()
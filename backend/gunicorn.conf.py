@@ -0,0 +1,57 @@
+"""
+Gunicorn settings for running several uvicorn workers:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The master imports the app and loads the catalog and rankers once, then forks
+the workers, which share that memory copy-on-write. Database connections are
+never shared: createDB drops inherited pools in every forked child, and each
+worker opens its own connections on first use. Metrics are summed over the
+workers through files in METRICS_DIR (see metrics.py).
+"""
+import os
+import tempfile
+
+
+def available_cores() -> int:
+    try:
+        # Respects CPU pinning and container cpusets
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS
+        return os.cpu_count() or 1
+
+
+cores = available_cores()
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+# Workers are async and mostly wait for the LLM, so one per core keeps every
+# core busy; WEB_CONCURRENCY overrides it
+workers = int(os.getenv("WEB_CONCURRENCY", str(cores)))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+# Settings read by the app when it is imported, so they have to be set here
+# Split the cores between the workers' password hashing pools instead of
+# giving every worker cores - 1 threads
+os.environ.setdefault("PASSWORD_WORKERS", str(max(1, cores // workers)))
+# Several processes write to the database: WAL and busy timeouts let them wait
+# for each other instead of failing with "database is locked"
+os.environ.setdefault("SQLITE_MODE", "production")
+# Workers write their metrics here, so that /metrics in any worker can sum them
+if "METRICS_DIR" not in os.environ:
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="gunicorn_metrics_")
+
+
+def on_starting(server):
+    # Counts of an earlier run in the same METRICS_DIR are not this run's
+    import metrics
+
+    metrics.REGISTRY.clear_directory()
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported, before the workers are forked
+    if preload_app:
+        import app
+
+        app.preload()
@@ -1,14 +1,21 @@
+import argparse
 import csv
 import os
-from sqlalchemy import Column, ForeignKey, Integer, PrimaryKeyConstraint, create_engine
+import time
+from sqlalchemy import Column, ForeignKey, Integer, PrimaryKeyConstraint, create_engine, func, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, declarative_base
 from createDB import (
     SessionLocal, 
     InnovationAreas, 
     Experts,
     ExpertAreas,
-    Base
+    Base,
+    record_cache_invalidation,
 )
+from catalog import catalog
+from invalidations import CATALOG, RETENTION
+from search import rebuild_expert_search_index
 
 
 
@@ -106,23 +113,166 @@ def import_innovation_data(db: Session, csv_path: str):
                         )
                         db.add(expert_area)
     
+    # Keep the full-text index in sync, in the same transaction
+    db.flush()
+    rebuild_expert_search_index(db.connection())
+    # Running workers reload their catalog once this commits
+    record_cache_invalidation(db, CATALOG, retention=RETENTION)
+
     # Commit all changes
     db.commit()
     print("Data import completed successfully")
 
+    # Swap in the new data if this process serves a catalog snapshot
+    if catalog.version is not None:
+        catalog.reload(db)
+
+def import_innovation_data_bulk(db: Session, csv_path: str, batch_size: int = 5000):
+    """
+    Import innovation ecosystem data from a CSV file using bulk statements.
+
+    The file is parsed once and areas and experts are resolved in memory, so
+    the number of statements does not grow with the number of rows. Experts
+    are matched on their natural key (name, institution, email): known
+    experts are updated, new ones inserted, and existing expert-area links
+    are left alone. Running the same import twice therefore changes nothing.
+    Everything happens in one transaction.
+
+    Args:
+        db: SQLAlchemy database session
+        csv_path: Path to the CSV file
+        batch_size: Number of rows per executemany batch
+
+    Returns:
+        Import statistics, or None if the file does not exist
+    """
+    # Check if file exists
+    if not os.path.exists(csv_path):
+        print(f"Error: File {csv_path} not found")
+        return None
+
+    print(f"Importing data from {csv_path} (bulk)...")
+    started = time.perf_counter()
+
+    # Single pass over the file: one entry per expert, keyed by natural key
+    rows = 0
+    experts = {}
+    with open(csv_path, 'r', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            rows += 1
+            focus_areas = [area.strip() for area in row['Focus Areas'].split(',')] if row['Focus Areas'] else []
+            email = row['Contact'] if 'Contact' in row else ''
+            key = (row['Name'], row['Institution'], email)
+            expert = {
+                "expert_name": row['Name'],
+                "expert_description": row['Description'],
+                "expert_institution": row['Institution'],
+                "expert_email": email,
+                "expert_website": row['Website'] if 'Website' in row else '',
+            }
+            areas = experts[key][1] if key in experts else []
+            experts[key] = (expert, areas + [a for a in focus_areas if a and a not in areas])
+
+    try:
+        # Resolve areas in memory, inserting only the missing ones
+        area_ids = {}
+        for area_id, name in db.query(InnovationAreas.innovation_area_id, InnovationAreas.innovation_area_name):
+            area_ids.setdefault(name, area_id)
+        next_area_id = (db.query(func.max(InnovationAreas.innovation_area_id)).scalar() or 0) + 1
+        new_areas = []
+        for _, areas in experts.values():
+            for name in areas:
+                if name not in area_ids:
+                    area_ids[name] = next_area_id
+                    new_areas.append({"innovation_area_id": next_area_id, "innovation_area_name": name})
+                    next_area_id += 1
+        _execute_in_batches(db, insert(InnovationAreas), new_areas, batch_size)
+
+        # Upsert experts on their natural key; new ids are assigned up front
+        # so no flush is needed to link them
+        expert_ids = {
+            (name, institution, email): expert_id
+            for expert_id, name, institution, email in db.query(
+                Experts.expert_id, Experts.expert_name, Experts.expert_institution, Experts.expert_email
+            )
+        }
+        next_expert_id = (db.query(func.max(Experts.expert_id)).scalar() or 0) + 1
+        new_experts, changed_experts, links = [], [], []
+        for key, (expert, areas) in experts.items():
+            if key in expert_ids:
+                changed_experts.append({"expert_id": expert_ids[key], **expert})
+            else:
+                expert_ids[key] = next_expert_id
+                new_experts.append({"expert_id": next_expert_id, **expert})
+                next_expert_id += 1
+            links += [{"expert_id": expert_ids[key], "area_id": area_ids[name]} for name in areas]
+        _execute_in_batches(db, insert(Experts), new_experts, batch_size)
+        _execute_in_batches(db, update(Experts), changed_experts, batch_size)
+        _execute_in_batches(
+            db, sqlite_insert(ExpertAreas).on_conflict_do_nothing(), links, batch_size
+        )
+        rebuild_expert_search_index(db.connection())
+        # Running workers reload their catalog once this commits
+        record_cache_invalidation(db, CATALOG, retention=RETENTION)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "rows": rows,
+        "new_areas": len(new_areas),
+        "new_experts": len(new_experts),
+        "updated_experts": len(changed_experts),
+        "links": len(links),
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else float("inf"),
+    }
+    print(
+        f"Data import completed successfully: {rows} rows in {elapsed:.2f}s "
+        f"({stats['rows_per_second']:.0f} rows/s), {len(new_areas)} new areas, "
+        f"{len(new_experts)} new and {len(changed_experts)} updated experts"
+    )
+
+    # Swap in the new data if this process serves a catalog snapshot
+    if catalog.version is not None:
+        catalog.reload(db)
+
+    return stats
+
+
+def _execute_in_batches(db: Session, statement, rows: list, batch_size: int):
+    """
+    Run an executemany-style statement over `rows` in chunks.
+    """
+    for start in range(0, len(rows), batch_size):
+        db.execute(statement, rows[start:start + batch_size])
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import innovation ecosystem data into the database")
+    parser.add_argument(
+        "csv_path",
+        nargs="?",
+        default="START Hack 25_Canton of St.Gallen_dataset innovation ecosystem_enriched_new.csv",
+    )
+    parser.add_argument("--bulk", action="store_true", help="Use the single-pass, idempotent bulk importer")
+    args = parser.parse_args()
+
     # Create database tables
     from createDB import engine
     Base.metadata.create_all(bind=engine)
     
-    # File path
-    csv_path = "START Hack 25_Canton of St.Gallen_dataset innovation ecosystem_enriched_new.csv"
-    
     # Create database session
     db = SessionLocal()
     
     try:
         # Import data
-        import_innovation_data(db, csv_path)
+        if args.bulk:
+            import_innovation_data_bulk(db, args.csv_path)
+        else:
+            import_innovation_data(db, args.csv_path)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
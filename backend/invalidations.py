@@ -0,0 +1,121 @@
+"""
+Cache invalidation across worker processes.
+
+Every worker (see gunicorn.conf.py) holds its own catalog snapshot, rankers
+and principal cache. When one of them changes the data behind a cache, or
+the importer does, it records a row in the `cache_invalidations` table. Every
+process polls the table and applies the rows it has not seen yet, so all
+workers drop stale data within one poll interval. A worker forked from the
+preloaded master starts where the master stopped reading, and catches up
+before it reports ready.
+"""
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, sessionmaker
+
+from createDB import (
+    ReadSessionLocal, get_cache_invalidations, get_last_cache_invalidation_id, record_cache_invalidation,
+)
+
+# Names of the invalidated caches
+CATALOG = "catalog"
+PRINCIPALS = "principals"
+
+# Rows older than this are deleted when new ones are recorded; a process that
+# has not caught up for longer than that treats every cache as stale
+RETENTION = timedelta(days=1)
+
+# Called with the stale keys, or None if the whole cache is stale
+Handler = Callable[[Optional[Set[str]]], None]
+
+
+def publish_invalidation(db: Session, cache: str, key: Optional[str] = None):
+    """
+    Record and commit an invalidation; meant for db_writer.submit.
+    """
+    record_cache_invalidation(db, cache, key, retention=RETENTION)
+    db.commit()
+
+
+class InvalidationListener:
+    """
+    Applies the invalidations recorded by any process to this process.
+    """
+
+    def __init__(self, session_factory: sessionmaker = ReadSessionLocal):
+        self.session_factory = session_factory
+        self._handlers: Dict[str, Handler] = {}
+        self._lock = threading.Lock()
+        # Id of the last row applied; None until start()
+        self.last_id: Optional[int] = None
+        self.synced_at: Optional[float] = None
+
+    def on(self, cache: str, handler: Handler):
+        self._handlers[cache] = handler
+
+    def start(self):
+        """
+        Skip the rows recorded so far. Call before this process loads the
+        data it caches; does nothing if already started (e.g. in the master).
+        """
+        with self._lock:
+            if self.last_id is not None:
+                return
+            db = self.session_factory()
+            try:
+                self.last_id = get_last_cache_invalidation_id(db)
+            finally:
+                db.close()
+            self.synced_at = time.time()
+
+    def catch_up(self) -> int:
+        """
+        Call the handlers for the rows recorded since the last call. Rows are
+        only marked as applied once every handler succeeded.
+
+        Returns:
+            Number of rows applied
+        """
+        self.start()
+        with self._lock:
+            started = time.time()
+            db = self.session_factory()
+            try:
+                rows = get_cache_invalidations(db, self.last_id)
+            finally:
+                db.close()
+
+            stale: Dict[str, Optional[Set[str]]] = {}
+            if started - self.synced_at > RETENTION.total_seconds():
+                # Rows this process never saw may have been deleted already
+                stale = {cache: None for cache in self._handlers}
+            for _, cache, key in rows:
+                if key is None:
+                    stale[cache] = None
+                elif stale.get(cache, set()) is not None:
+                    stale.setdefault(cache, set()).add(key)
+
+            for cache, keys in stale.items():
+                handler = self._handlers.get(cache)
+                if handler is not None:
+                    handler(keys)
+            if rows:
+                self.last_id = rows[-1][0]
+            self.synced_at = started
+            return len(rows)
+
+    async def run(self, interval: float):
+        """
+        Catch up every `interval` seconds until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(self.catch_up)
+            except Exception as e:
+                print(f"Error applying cache invalidations: {str(e)}")
@@ -0,0 +1,232 @@
+"""
+Shared async LLM gateway for the Innovation Ecosystem API.
+"""
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from starlette.requests import Request
+
+from llm_backends import LLM_BACKEND, create_async_client
+from metrics import record_llm_call
+
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# How often we check whether the client that triggered a call is still there
+DISCONNECT_POLL_INTERVAL = 0.25
+
+
+class LLMTimeoutError(Exception):
+    """
+    Raised when an LLM call does not finish within its timeout.
+    """
+
+
+class ClientDisconnectedError(Exception):
+    """
+    Raised when the HTTP client went away while its LLM call was running.
+    """
+
+
+class LLMGateway:
+    """
+    Async wrapper around the OpenAI client.
+
+    All endpoints share one instance, so HTTP connections are pooled and
+    reused, and the number of concurrent upstream calls is capped by a
+    semaphore. Every call gets a timeout and is cancelled as soon as the
+    requesting client disconnects.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT,
+        base_url: Optional[str] = None,
+        backend: str = LLM_BACKEND,
+    ):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.api_key = api_key
+        self.base_url = base_url
+        self.backend = backend
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client = None
+
+    @property
+    def client(self):
+        """
+        OpenAI client, or a record/replay/stub stand-in (see llm_backends).
+
+        Created on first use, so importing the app does not import openai or
+        load TLS certificates. Raises openai.OpenAIError on first use if the
+        live backend has no API key.
+        """
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=self.timeout,
+            )
+            self._client = create_async_client(
+                backend=self.backend,
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=LLM_MAX_RETRIES,
+            )
+            self._http_client = http_client
+        return self._client
+
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str = DEFAULT_MODEL,
+        request: Optional[Request] = None,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Optional[str]:
+        """
+        Run a chat completion and return the content of the first choice.
+
+        Args:
+            messages: Chat messages sent to the model
+            model: Model name
+            request: Incoming request; the call is cancelled if its client disconnects
+            timeout: Overrides the gateway timeout for this call (includes queueing)
+            **kwargs: Passed through to chat.completions.create
+
+        Raises:
+            LLMTimeoutError: If the call (including waiting for a slot) times out
+            ClientDisconnectedError: If the client disconnected during the call
+        """
+        started = time.perf_counter()
+        try:
+            completion = await self._run(
+                self._create(model=model, messages=messages, **kwargs),
+                request=request,
+                timeout=timeout,
+            )
+        except BaseException as e:
+            record_llm_call(model, "complete", _outcome(e), time.perf_counter() - started)
+            raise
+        record_llm_call(model, "complete", "ok", time.perf_counter() - started, completion.usage)
+        return completion.choices[0].message.content
+
+    async def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str = DEFAULT_MODEL,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion and yield content deltas as they arrive.
+
+        The concurrency slot is held until the stream is exhausted or closed.
+        The timeout applies to the first delta and to every gap between
+        deltas. Disconnects are handled by the caller closing the generator
+        (StreamingResponse does this when the client goes away).
+
+        Raises:
+            LLMTimeoutError: If the model stalls for longer than the timeout
+        """
+        timeout = timeout or self.timeout
+        started = time.perf_counter()
+        outcome, usage = "disconnected", None
+        async with self._semaphore:
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        stream=True,
+                        # The last chunk then carries the token usage
+                        stream_options={"include_usage": True},
+                        **kwargs,
+                    ),
+                    timeout,
+                )
+                chunks = response.__aiter__()
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                        except StopAsyncIteration:
+                            break
+                        if getattr(chunk, "usage", None):
+                            usage = chunk.usage
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                    outcome = "ok"
+                finally:
+                    # Drops the upstream connection if we stop early
+                    await response.close()
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise LLMTimeoutError()
+            except Exception as e:
+                outcome = _outcome(e)
+                raise
+            finally:
+                record_llm_call(model, "stream", outcome, time.perf_counter() - started, usage)
+
+    async def _create(self, **kwargs):
+        async with self._semaphore:
+            return await self.client.chat.completions.create(**kwargs)
+
+    async def _run(self, coro, request: Optional[Request], timeout: Optional[float]):
+        call = asyncio.ensure_future(asyncio.wait_for(coro, timeout or self.timeout))
+        if request is None:
+            return await self._await_call(call)
+
+        watcher = asyncio.ensure_future(wait_for_disconnect(request))
+        try:
+            await asyncio.wait({call, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not call.done():
+                call.cancel()
+            watcher.cancel()
+
+        if not call.done() or call.cancelled():
+            raise ClientDisconnectedError()
+        return await self._await_call(call)
+
+    @staticmethod
+    async def _await_call(call):
+        try:
+            return await call
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError()
+
+    async def close(self):
+        """
+        Close the pooled HTTP connections.
+        """
+        if self._http_client is not None:
+            await self._http_client.aclose()
+
+
+def _outcome(e: BaseException) -> str:
+    if isinstance(e, LLMTimeoutError):
+        return "timeout"
+    if isinstance(e, (ClientDisconnectedError, asyncio.CancelledError)):
+        return "disconnected"
+    return "error"
+
+
+async def wait_for_disconnect(request: Request):
+    """
+    Return once the client of a request has disconnected.
+    """
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
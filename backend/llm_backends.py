@@ -0,0 +1,342 @@
+"""
+Pluggable LLM backends: live, record, replay and stub.
+
+Every backend is exposed through an OpenAI-compatible client object
+(`client.chat.completions.create(...)`), so the API gateway and the scripts
+in python_scripts/ work unchanged with any of them.
+
+- live: the real OpenAI API
+- record: the real OpenAI API, and every completion is appended to a cassette
+- replay: answers from the cassette by request hash, optionally with
+  simulated latency; unknown requests fall back to the stub (or fail)
+- stub: deterministic offline answers, no network and no API key
+
+The cassette is a JSON-lines file with one completion per line.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+# openai is imported on first use, it takes longer to import than the rest of the app
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "live")
+LLM_CASSETTE = os.getenv("LLM_CASSETTE", "llm_cassette.jsonl")
+# Seconds to wait before answering in replay and stub mode
+LLM_REPLAY_LATENCY = float(os.getenv("LLM_REPLAY_LATENCY", "0"))
+# What replay does on a cassette miss: "stub" or "error"
+LLM_REPLAY_FALLBACK = os.getenv("LLM_REPLAY_FALLBACK", "stub")
+
+BACKENDS = ("live", "record", "replay", "stub")
+# Request parameters that do not change the completion
+_UNHASHED_PARAMS = {"stream", "stream_options", "timeout", "extra_headers"}
+_AREAS_RE = re.compile(r"The focus areas are: (.*?)\. Return only", re.DOTALL)
+
+
+class CassetteMissError(Exception):
+    """
+    Raised in replay mode when a request was never recorded.
+    """
+
+
+def needs_api_key(backend: str = LLM_BACKEND) -> bool:
+    return backend in ("live", "record")
+
+
+def request_key(params: Dict[str, Any]) -> str:
+    """
+    Hash of everything in a request that influences the completion.
+    """
+    relevant = {k: v for k, v in params.items() if k not in _UNHASHED_PARAMS}
+    payload = json.dumps(relevant, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class Cassette:
+    """
+    Recorded completions keyed by request hash, backed by a JSON-lines file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def put(self, key: str, model: str, content: str, usage: Optional[Dict[str, int]] = None):
+        entry = {"key": key, "model": model, "content": content, "usage": usage}
+        with self._lock:
+            self._entries[key] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def stub_content(params: Dict[str, Any]) -> str:
+    """
+    Deterministic answer for a request, shaped like what the caller expects.
+    """
+    key = request_key(params)
+    response_format = params.get("response_format") or {}
+    schema = (response_format.get("json_schema") or {}).get("schema")
+    if schema and schema.get("type") == "object":
+        return json.dumps({
+            name: _stub_value(key, name, spec) for name, spec in schema.get("properties", {}).items()
+        })
+
+    messages = params.get("messages") or []
+    system = messages[0].get("content") if messages else None
+    match = _AREAS_RE.search(system) if isinstance(system, str) else None
+    if match:
+        areas = [a.strip() for a in match.group(1).split(", ") if a.strip()]
+        return json.dumps({area: _stub_number(key, area) for area in areas})
+
+    return f"This is a stub answer ({key[:8]}). What would you like to do next?"
+
+
+def _stub_number(key: str, name: str) -> int:
+    return int(hashlib.sha256(f"{key}:{name}".encode("utf-8")).hexdigest()[:8], 16) % 101
+
+
+def _stub_value(key: str, name: str, spec: Dict[str, Any]) -> Any:
+    if spec.get("type") in ("number", "integer"):
+        return _stub_number(key, name)
+    if spec.get("type") == "boolean":
+        return _stub_number(key, name) % 2 == 0
+    return "stub"
+
+
+def build_completion(model: str, content: str, usage: Optional[Dict[str, int]] = None) -> "ChatCompletion":
+    from openai.types.chat import ChatCompletion
+
+    if usage is None:
+        usage = {"prompt_tokens": 0, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["completion_tokens"]
+    return ChatCompletion.model_validate({
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": usage,
+    })
+
+
+def build_chunks(model: str, content: str) -> List["ChatCompletionChunk"]:
+    from openai.types.chat import ChatCompletionChunk
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    pieces = re.findall(r"\S+\s*|\s+", content) or [""]
+    deltas = [{"content": piece} for piece in pieces] + [{}]
+    return [
+        ChatCompletionChunk.model_validate({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "delta": delta,
+                "finish_reason": None if delta else "stop",
+            }],
+        })
+        for delta in deltas
+    ]
+
+
+class _ChunkStream:
+    """
+    Sync and async iterator over prepared chunks, shaped like openai's Stream.
+    """
+
+    def __init__(self, chunks: List["ChatCompletionChunk"]):
+        self._chunks = iter(chunks)
+
+    def __iter__(self):
+        return self._chunks
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    def close(self):
+        self._chunks = iter(())
+
+
+class _AsyncChunkStream(_ChunkStream):
+    async def close(self):
+        super().close()
+
+
+class _RecordingStream:
+    """
+    Passes a live stream through and records the full content when it ends.
+    """
+
+    def __init__(self, stream, on_complete):
+        self._stream = stream
+        self._on_complete = on_complete
+        self._parts: List[str] = []
+
+    def _collect(self, chunk):
+        if chunk.choices and chunk.choices[0].delta.content:
+            self._parts.append(chunk.choices[0].delta.content)
+        return chunk
+
+    def __iter__(self):
+        for chunk in self._stream:
+            yield self._collect(chunk)
+        self._on_complete("".join(self._parts))
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        async for chunk in self._stream:
+            yield self._collect(chunk)
+        self._on_complete("".join(self._parts))
+
+    def close(self):
+        return self._stream.close()
+
+
+class _OfflineCompletions:
+    """
+    chat.completions for the record, replay and stub backends.
+    """
+
+    def __init__(self, backend: str, cassette: Optional[Cassette], live, is_async: bool):
+        self.backend = backend
+        self.cassette = cassette
+        self.live = live
+        self.is_async = is_async
+
+    def _offline_content(self, params: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, int]]]:
+        if self.backend == "replay":
+            entry = self.cassette.get(request_key(params))
+            if entry is not None:
+                return entry["content"], entry.get("usage")
+            if LLM_REPLAY_FALLBACK != "stub":
+                raise CassetteMissError(request_key(params))
+        return stub_content(params), None
+
+    def _offline_response(self, params: Dict[str, Any]):
+        content, usage = self._offline_content(params)
+        model = params.get("model", "")
+        if params.get("stream"):
+            stream_class = _AsyncChunkStream if self.is_async else _ChunkStream
+            return stream_class(build_chunks(model, content))
+        return build_completion(model, content, usage)
+
+    def _record(self, params: Dict[str, Any], response):
+        key = request_key(params)
+        model = params.get("model", "")
+        if params.get("stream"):
+            return _RecordingStream(response, lambda content: self.cassette.put(key, model, content))
+        usage = response.usage.model_dump() if response.usage else None
+        self.cassette.put(key, model, response.choices[0].message.content or "", usage)
+        return response
+
+    def create(self, **params):
+        if self.is_async:
+            return self._acreate(**params)
+        if self.backend == "record":
+            return self._record(params, self.live.chat.completions.create(**params))
+        if LLM_REPLAY_LATENCY:
+            time.sleep(LLM_REPLAY_LATENCY)
+        return self._offline_response(params)
+
+    async def _acreate(self, **params):
+        if self.backend == "record":
+            return self._record(params, await self.live.chat.completions.create(**params))
+        if LLM_REPLAY_LATENCY:
+            await asyncio.sleep(LLM_REPLAY_LATENCY)
+        return self._offline_response(params)
+
+
+class _OfflineChat:
+    def __init__(self, completions: _OfflineCompletions):
+        self.completions = completions
+
+
+class OfflineClient:
+    """
+    OpenAI-compatible client for the record, replay and stub backends.
+    """
+
+    def __init__(self, backend: str, cassette: Optional[Cassette], live=None, is_async: bool = False):
+        self.backend = backend
+        self.cassette = cassette
+        self.chat = _OfflineChat(_OfflineCompletions(backend, cassette, live, is_async))
+
+
+_cassettes: Dict[str, Cassette] = {}
+
+
+def get_cassette(path: str = LLM_CASSETTE) -> Cassette:
+    """
+    Shared cassette per file, so recording clients do not clobber each other.
+    """
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+
+def create_async_client(backend: str = LLM_BACKEND, cassette_path: str = LLM_CASSETTE, **openai_kwargs):
+    """
+    Async OpenAI-compatible client for the configured backend.
+
+    Args:
+        backend: One of BACKENDS
+        cassette_path: Cassette used by record and replay
+        **openai_kwargs: Passed to openai.AsyncOpenAI for live and record
+    """
+    import openai
+
+    return _create_client(backend, cassette_path, openai.AsyncOpenAI, True, openai_kwargs)
+
+
+def create_sync_client(backend: str = LLM_BACKEND, cassette_path: str = LLM_CASSETTE, **openai_kwargs):
+    """
+    Sync OpenAI-compatible client for the configured backend, for scripts.
+    """
+    import openai
+
+    return _create_client(backend, cassette_path, openai.OpenAI, False, openai_kwargs)
+
+
+def _create_client(backend, cassette_path, client_class, is_async, openai_kwargs):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if backend == "live":
+        return client_class(**openai_kwargs)
+    live = client_class(**openai_kwargs) if backend == "record" else None
+    cassette = get_cassette(cassette_path) if backend in ("record", "replay") else None
+    return OfflineClient(backend, cassette, live, is_async)
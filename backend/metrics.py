@@ -0,0 +1,430 @@
+"""
+Prometheus-style metrics in the text exposition format.
+
+A small self-contained implementation of counters, gauges and histograms,
+plus an ASGI middleware that records per-route request metrics and
+SQLAlchemy hooks that record query counts and durations. Everything is
+rendered by `REGISTRY.render()` and served on /metrics.
+
+Every process counts on its own. With METRICS_DIR set (gunicorn.conf.py
+does this), each process also writes its values to a file in that directory
+every METRICS_FLUSH_INTERVAL seconds, and /metrics renders the sum over all
+files, so every worker answers a scrape with the same totals. Counters and
+histograms keep the counts of exited workers; gauges only sum running ones.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+DB_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+LabelValues = Tuple[str, ...]
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), chr(92) + "n")}"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _add(a, b):
+    # Values are numbers or (nested) lists of numbers, e.g. histogram buckets
+    if isinstance(a, list):
+        return [_add(x, y) for x, y in zip(a, b)]
+    return a + b
+
+
+class _Metric:
+    kind = ""
+    # Whether the values of exited processes still count when merging
+    # processes (counters), or only those of running ones (gauges)
+    keep_exited = True
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def collect(self) -> Dict[LabelValues, Any]:
+        """
+        Current values of this process by label values.
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+    def render(self, values: Optional[Dict[LabelValues, Any]] = None) -> List[str]:
+        """
+        Exposition lines for `values` (default: this process's).
+        """
+        items = (self.collect() if values is None else values).items()
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> Dict[LabelValues, Any]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    kind = "gauge"
+    keep_exited = False
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class CallbackGauge(_Metric):
+    """
+    Gauge whose values are read from a callback at render time.
+
+    The callback returns a mapping from label values to the current value.
+    """
+
+    kind = "gauge"
+    keep_exited = False
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str],
+                 callback: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self) -> Dict[LabelValues, Any]:
+        return self.callback()
+
+
+class RatioGauge(CallbackGauge):
+    """
+    Gauge of numerator / denominator. The callback returns both, so that the
+    ratio over several processes is computed from their sums.
+    """
+
+    def render(self, values: Optional[Dict[LabelValues, Any]] = None) -> List[str]:
+        items = (self.collect() if values is None else values).items()
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} "
+            f"{_format_value(numerator / denominator if denominator else 0.0)}"
+            for key, (numerator, denominator) in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def collect(self) -> Dict[LabelValues, Any]:
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self, values: Optional[Dict[LabelValues, Any]] = None) -> List[str]:
+        lines = self.header()
+        items = (self.collect() if values is None else values).items()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def _process_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    def __init__(self, directory: Optional[str] = None):
+        self._metrics: Dict[str, _Metric] = {}
+        # Where every process writes its values; None to render this process only
+        self.directory = directory
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def reset(self):
+        """
+        Zero the counts, e.g. in a forked worker, which would otherwise
+        report its parent's counts as its own.
+        """
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def clear_directory(self):
+        """
+        Remove the files of an earlier run from the metrics directory.
+        """
+        for filename in os.listdir(self.directory):
+            if filename.startswith("metrics_"):
+                os.remove(os.path.join(self.directory, filename))
+
+    def flush(self):
+        """
+        Write this process's values to its file in the metrics directory.
+        """
+        if not self.directory:
+            return
+        state = {
+            name: [[list(key), value] for key, value in metric.collect().items()]
+            for name, metric in self._metrics.items()
+        }
+        path = os.path.join(self.directory, f"metrics_{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        # Readers never see a half-written file
+        os.replace(path + ".tmp", path)
+
+    def _merged_values(self) -> Dict[str, Dict[LabelValues, Any]]:
+        self.flush()
+        merged: Dict[str, Dict[LabelValues, Any]] = {name: {} for name in self._metrics}
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith("metrics_") and filename.endswith(".json")):
+                continue
+            pid = int(filename[len("metrics_"):-len(".json")])
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            running = _process_running(pid)
+            for name, items in state.items():
+                metric = self._metrics.get(name)
+                if metric is None or not (running or metric.keep_exited):
+                    continue
+                values = merged[name]
+                for key, value in items:
+                    key = tuple(key)
+                    values[key] = _add(values[key], value) if key in values else value
+        return merged
+
+    def render(self) -> str:
+        merged = self._merged_values() if self.directory else {}
+        lines = []
+        for name, metric in self._metrics.items():
+            lines += metric.render(merged.get(name))
+        return "\n".join(lines) + "\n"
+
+    async def run_flush(self, interval: float):
+        """
+        Flush every `interval` seconds until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                print(f"Error writing metrics: {str(e)}")
+
+
+REGISTRY = Registry(METRICS_DIR)
+# Counts start at zero in every forked worker
+os.register_at_fork(after_in_child=REGISTRY.reset)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time until the response body was sent.", ("method", "route")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", ("method", "route")))
+
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "llm_requests_total", "LLM calls by outcome (ok, timeout, disconnected, error).", ("model", "kind", "outcome")))
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "llm_request_duration_seconds", "LLM call duration, including waiting for a slot.", ("model", "kind"),
+    buckets=LLM_BUCKETS))
+LLM_PROMPT_TOKENS = REGISTRY.register(Counter(
+    "llm_prompt_tokens_total", "Prompt tokens reported by the LLM.", ("model",)))
+LLM_COMPLETION_TOKENS = REGISTRY.register(Counter(
+    "llm_completion_tokens_total", "Completion tokens reported by the LLM.", ("model",)))
+
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total", "SQL statements executed.", ("engine",)))
+DB_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "SQL statement duration.", ("engine",), buckets=DB_BUCKETS))
+
+_caches: Dict[str, object] = {}
+
+
+def register_cache(name: str, cache):
+    """
+    Export hit/miss counters of a cache that has `hits` and `misses` attributes.
+    """
+    _caches[name] = cache
+
+
+def _cache_values(attribute: str) -> Dict[LabelValues, float]:
+    return {(name,): getattr(cache, attribute) for name, cache in _caches.items()}
+
+
+def _cache_hits_and_lookups() -> Dict[LabelValues, list]:
+    return {(name,): [cache.hits, cache.hits + cache.misses] for name, cache in _caches.items()}
+
+
+REGISTRY.register(CallbackGauge(
+    "cache_hits", "Cache hits since start.", ("cache",), lambda: _cache_values("hits")))
+REGISTRY.register(CallbackGauge(
+    "cache_misses", "Cache misses since start.", ("cache",), lambda: _cache_values("misses")))
+REGISTRY.register(RatioGauge(
+    "cache_hit_ratio", "Cache hits / lookups since start.", ("cache",), _cache_hits_and_lookups))
+
+
+def record_llm_call(model: str, kind: str, outcome: str, seconds: float, usage=None):
+    LLM_REQUESTS.inc(model=model, kind=kind, outcome=outcome)
+    LLM_LATENCY.observe(seconds, model=model, kind=kind)
+    if usage is not None:
+        LLM_PROMPT_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model)
+        LLM_COMPLETION_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model)
+
+
+_instrumented_engines = set()
+
+
+def instrument_engine(engine: Engine, name: str):
+    """
+    Count and time every statement executed through an engine.
+    """
+    if id(engine) in _instrumented_engines:
+        return
+    _instrumented_engines.add(id(engine))
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_query_start"].pop()
+        DB_QUERIES.inc(engine=name)
+        DB_LATENCY.observe(time.perf_counter() - started, engine=name)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request count, latency and in-flight requests
+    per route template (e.g. "/chat/{id}", not the raw path).
+
+    Latency is measured until the last body chunk was sent, so streaming
+    responses are counted in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        status_code = 500
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(method=method, route=route)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status_code)
+            HTTP_LATENCY.observe(time.perf_counter() - started, method=method, route=route)
+
+    @staticmethod
+    def _route_template(scope) -> str:
+        app = scope.get("app")
+        routes = getattr(getattr(app, "router", None), "routes", [])
+        for route in routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
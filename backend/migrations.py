@@ -0,0 +1,165 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+`Base.metadata.create_all` only creates missing tables, it never changes an
+existing `sqlite.db`. Schema changes to existing tables therefore go here.
+The applied version is stored in SQLite's `PRAGMA user_version`, and every
+pending migration runs once, in order, inside its own transaction.
+
+Usage:
+    python migrations.py            # apply pending migrations
+    python migrations.py --check    # also verify the hot queries use indexes
+"""
+import sys
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from search import CREATE_EXPERTS_FTS, rebuild_expert_search_index
+
+
+def _unique_area_names(conn: Connection):
+    # Merge duplicated area names into the lowest id before enforcing uniqueness
+    duplicates = conn.execute(text(
+        "SELECT innovation_area_id, "
+        "(SELECT MIN(innovation_area_id) FROM innovation_areas keep "
+        " WHERE keep.innovation_area_name = a.innovation_area_name) AS keep_id "
+        "FROM innovation_areas a"
+    )).all()
+    for area_id, keep_id in duplicates:
+        if area_id == keep_id:
+            continue
+        conn.execute(
+            text("UPDATE OR IGNORE expert_areas SET area_id = :keep WHERE area_id = :old"),
+            {"keep": keep_id, "old": area_id},
+        )
+        conn.execute(
+            text("UPDATE OR IGNORE identified_areas SET areas_id = :keep WHERE areas_id = :old"),
+            {"keep": keep_id, "old": area_id},
+        )
+        conn.execute(text("DELETE FROM expert_areas WHERE area_id = :old"), {"old": area_id})
+        conn.execute(text("DELETE FROM identified_areas WHERE areas_id = :old"), {"old": area_id})
+        conn.execute(text("DELETE FROM innovation_areas WHERE innovation_area_id = :old"), {"old": area_id})
+
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_innovation_areas_name "
+        "ON innovation_areas (innovation_area_name)"
+    ))
+
+
+def _lookup_indexes(conn: Connection):
+    # /init and the catalog look up experts by area; the primary key starts with expert_id
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_expert_areas_area_id "
+        "ON expert_areas (area_id, expert_id)"
+    ))
+    # Natural key used by the bulk importer
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_experts_natural_key "
+        "ON experts (expert_name, expert_institution, expert_email)"
+    ))
+
+
+def _expert_search_index(conn: Connection):
+    conn.execute(text(CREATE_EXPERTS_FTS))
+    rebuild_expert_search_index(conn)
+
+
+# (version, description, upgrade function); append only, never reorder
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "unique index on innovation area names", _unique_area_names),
+    (2, "secondary indexes for area and natural-key lookups", _lookup_indexes),
+    (3, "FTS5 full-text index of experts", _expert_search_index),
+]
+
+# Queries on the request and import paths that must be answered from an index
+HOT_QUERIES = {
+    "area by name": "SELECT innovation_area_id FROM innovation_areas WHERE innovation_area_name = 'x'",
+    "experts by area": "SELECT expert_id FROM expert_areas WHERE area_id = 1",
+    "experts of areas by name": (
+        "SELECT ea.expert_id FROM expert_areas ea "
+        "JOIN innovation_areas ia ON ia.innovation_area_id = ea.area_id "
+        "WHERE ia.innovation_area_name IN ('x', 'y')"
+    ),
+    "expert by natural key": (
+        "SELECT expert_id FROM experts "
+        "WHERE expert_name = 'x' AND expert_institution = 'y' AND expert_email = 'z'"
+    ),
+    "user by name": "SELECT user_id FROM users WHERE username = 'x'",
+    "expert search": (
+        "SELECT e.expert_id FROM experts_fts JOIN experts e ON e.expert_id = experts_fts.rowid "
+        "WHERE experts_fts MATCH '\"data\"*' ORDER BY rank LIMIT 20"
+    ),
+    "cache invalidations since": "SELECT id, cache, key FROM cache_invalidations WHERE id > 1 ORDER BY id",
+    "expired cache invalidations": "SELECT id FROM cache_invalidations WHERE created_at < '2000-01-01'",
+}
+
+
+def get_schema_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def run_migrations(engine: Engine) -> int:
+    """
+    Apply all pending migrations.
+
+    Returns:
+        The schema version after migrating
+    """
+    with engine.connect() as conn:
+        version = get_schema_version(conn)
+    for target, description, upgrade in MIGRATIONS:
+        if target <= version:
+            continue
+        with engine.begin() as conn:
+            print(f"Applying migration {target}: {description}")
+            upgrade(conn)
+            # PRAGMA does not accept bound parameters
+            conn.execute(text(f"PRAGMA user_version = {int(target)}"))
+        version = target
+    return version
+
+
+def query_plan(conn: Connection, query: str) -> List[str]:
+    """
+    The steps of EXPLAIN QUERY PLAN for a query.
+    """
+    return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {query}"))]
+
+
+def is_table_scan(detail: str) -> bool:
+    """
+    Whether a plan step reads a whole table or index instead of searching it.
+    FTS5 answers MATCH from its own index, which the plan shows as a
+    "SCAN <table> VIRTUAL TABLE INDEX ..." step.
+    """
+    return detail.startswith("SCAN") and "VIRTUAL TABLE" not in detail
+
+
+def find_table_scans(engine: Engine) -> List[Tuple[str, str]]:
+    """
+    Run EXPLAIN QUERY PLAN on every hot query.
+
+    Returns:
+        (query name, plan step) for every step that scans a table or a whole
+        index; empty if all hot queries are index lookups
+    """
+    scans = []
+    with engine.connect() as conn:
+        for name, query in HOT_QUERIES.items():
+            scans.extend((name, detail) for detail in query_plan(conn, query) if is_table_scan(detail))
+    return scans
+
+
+if __name__ == "__main__":
+    from createDB import engine
+
+    print(f"Schema version: {run_migrations(engine)}")
+    if "--check" in sys.argv:
+        scans = find_table_scans(engine)
+        for name, detail in scans:
+            print(f"Table scan in '{name}': {detail}")
+        if scans:
+            sys.exit(1)
+        print("All hot queries use indexes")
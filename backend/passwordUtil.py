@@ -1,5 +1,25 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+# bcrypt releases the GIL, so hashes run in parallel on a pool sized to the
+# cores, leaving one core for the event loop
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Password operations allowed to wait or run at once before new ones are rejected
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_WORKERS * 4)))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="password")
+_pending = 0
+
+
+class PasswordPoolBusyError(Exception):
+    """
+    Raised when too many password operations are already queued.
+    """
+
+
 # Hash a password using bcrypt
 def hash_password(password):
     pwd_bytes = password.encode('utf-8')
@@ -11,3 +31,32 @@ def hash_password(password):
 def verify_password(plain_password, hashed_password):
     password_byte_enc = plain_password.encode('utf-8')
     return bcrypt.checkpw(password = password_byte_enc , hashed_password = hashed_password)
+
+async def _run_in_pool(fn, *args):
+    # Only touched from the event loop thread, so no lock is needed
+    global _pending
+    if _pending >= PASSWORD_QUEUE_LIMIT:
+        raise PasswordPoolBusyError()
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password_async(password):
+    """
+    Hash a password on the password pool without blocking the event loop.
+
+    Raises:
+        PasswordPoolBusyError: If the pool queue is full
+    """
+    return await _run_in_pool(hash_password, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Check a password on the password pool without blocking the event loop.
+
+    Raises:
+        PasswordPoolBusyError: If the pool queue is full
+    """
+    return await _run_in_pool(verify_password, plain_password, hashed_password)
@@ -0,0 +1,93 @@
+"""
+Prompt builders for the LLM calls.
+
+Prompts are laid out for provider-side prefix caching: the static part that
+only depends on the catalog comes first and is byte-for-byte identical for
+every user (areas sorted, no interpolated whitespace), and everything
+user-specific comes last. Area scores are requested with a strict JSON
+schema, so the reply is always a parseable object with one integer per area.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Bump when the area scoring prompt or schema changes; part of the score cache key
+AREA_SCORING_PROMPT_VERSION = "2"
+
+
+def _canonical_area_names(area_names: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(sorted(set(area_names)))
+
+
+@lru_cache(maxsize=8)
+def _area_scoring_system_prompt(area_names: Tuple[str, ...]) -> str:
+    return (
+        "You are a helpful assistant which guides users though an innovation process. "
+        "Your users are managing directors of companies who look into how to innovate their business. "
+        "In a first stage, we try to find the best innovation focus area for the company based on the sector "
+        "they work in and the problems they face. For every focus area, rate from 0 to 100 how well it fits "
+        "the current situation of the user.\n"
+        f"The focus areas are: {', '.join(area_names)}. "
+        "Return only the JSON object mapping every area name to its rating."
+    )
+
+
+@lru_cache(maxsize=8)
+def _area_scores_response_format(area_names: Tuple[str, ...]) -> Dict[str, Any]:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "area_scores",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {name: {"type": "integer"} for name in area_names},
+                "required": list(area_names),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def area_scoring_messages(area_names: Iterable[str], role: str, problem: str) -> List[Dict[str, str]]:
+    """
+    Build the chat messages that ask the model to rate every area for a user.
+
+    The system message only depends on the set of areas, so it is identical
+    across users and catalog reloads that do not change the areas.
+    """
+    return [
+        {"role": "system", "content": _area_scoring_system_prompt(_canonical_area_names(area_names))},
+        {
+            "role": "user",
+            "content": f'Calculate the fit of the areas for the following person. '
+                       f'The person has the role {role} and has the problem: "{problem}".',
+        },
+    ]
+
+
+def area_scores_response_format(area_names: Iterable[str]) -> Dict[str, Any]:
+    """
+    response_format that constrains the reply to {area name: integer} with every area present.
+    """
+    return _area_scores_response_format(_canonical_area_names(area_names))
+
+
+def parse_area_scores(content: str, area_names: Iterable[str]) -> Dict[str, int]:
+    """
+    Parse a schema-constrained area scoring reply.
+
+    Unknown areas and non-numeric ratings are dropped, ratings are clamped to 0-100.
+
+    Raises:
+        ValueError: If the reply is not a JSON object
+    """
+    scores = json.loads(content)
+    if not isinstance(scores, dict):
+        raise ValueError("Area scores are not a JSON object")
+    known = set(area_names)
+    return {
+        name: max(0, min(100, int(value)))
+        for name, value in scores.items()
+        if name in known and isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
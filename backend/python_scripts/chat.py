@@ -1,14 +1,18 @@
 import json
 import os
-import openai
+import sys
 
-# Get API key from environment variable
+# Make the backend modules importable when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_backends import create_sync_client, needs_api_key
+
+# Get API key from environment variable (not needed by the replay and stub backends)
 api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
+if not api_key and needs_api_key():
     raise ValueError("OPENAI_API_KEY not found in environment variables")
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=api_key)
+# Initialize OpenAI client (or its record/replay/stub stand-in, see LLM_BACKEND)
+client = create_sync_client(api_key=api_key)
 
 # read different focus areas from distinct_focus_areas.csv
 import pandas as pd
@@ -0,0 +1,303 @@
+"""
+Local vectorized ranking of innovation areas and of their experts.
+
+Alternative to asking GPT for area fit percentages in /init. Every area is
+represented by a TF-IDF vector over hashed word n-grams built from its name
+and the descriptions of the experts linked to it. A user's role and problem
+are vectorized the same way and scored against all areas with one matrix
+product.
+
+The contacts shown for an area are ranked the same way: every expert linked
+to the area is scored against the user's problem with precomputed expert
+vectors, and the best few are kept.
+"""
+import heapq
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from catalog import CatalogSnapshot
+
+# Number of hash buckets; collisions are rare for the short texts we embed
+VECTOR_DIM = 2 ** 12
+# How much the area name counts compared to the mean expert description
+AREA_NAME_WEIGHT = 2.0
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def hashed_features(text: str, dim: int = VECTOR_DIM) -> Counter:
+    """
+    Count hashed word unigrams and bigrams of a text.
+
+    crc32 is used instead of hash() so buckets are stable across processes.
+    """
+    tokens = tokenize(text)
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return Counter(zlib.crc32(g.encode("utf-8")) % dim for g in grams)
+
+
+def compute_idf(documents: Iterable[Counter], dim: int = VECTOR_DIM) -> np.ndarray:
+    """
+    Smoothed inverse document frequency per hash bucket.
+    """
+    df = np.zeros(dim, dtype=np.float32)
+    n_docs = 0
+    for features in documents:
+        n_docs += 1
+        for bucket in features:
+            df[bucket] += 1
+    return idf_from_document_frequency(df, n_docs)
+
+
+def idf_from_document_frequency(df: np.ndarray, n_docs: int) -> np.ndarray:
+    return (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+
+
+def tfidf_vector(features: Counter, idf: np.ndarray) -> np.ndarray:
+    """
+    L2-normalized TF-IDF vector with sublinear term frequency.
+    """
+    vector = np.zeros(idf.shape[0], dtype=np.float32)
+    for bucket, count in features.items():
+        vector[bucket] = (1 + math.log(count)) * idf[bucket]
+    return normalize(vector)
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class LocalAreaRanker:
+    """
+    Precomputed area vectors, scored against a query in one matrix product.
+    """
+
+    def __init__(self, area_names: List[str], area_matrix: np.ndarray, idf: np.ndarray):
+        self.area_names = area_names
+        self.area_matrix = area_matrix
+        self.idf = idf
+
+    @classmethod
+    def build(
+        cls,
+        areas: List[Tuple[int, str]],
+        experts: Dict[int, str],
+        links: Iterable[Tuple[int, int]],
+        dim: int = VECTOR_DIM,
+    ) -> "LocalAreaRanker":
+        """
+        Build a ranker from plain catalog data.
+
+        Args:
+            areas: (area id, area name) pairs
+            experts: Expert id to expert description
+            links: (expert id, area id) pairs
+            dim: Number of hash buckets
+        """
+        area_features = {area_id: hashed_features(name, dim) for area_id, name in areas}
+        expert_features = {expert_id: hashed_features(desc, dim) for expert_id, desc in experts.items()}
+        idf = compute_idf(list(area_features.values()) + list(expert_features.values()), dim)
+
+        row_of = {area_id: row for row, (area_id, _) in enumerate(areas)}
+        name_matrix = np.zeros((len(areas), dim), dtype=np.float32)
+        for area_id, features in area_features.items():
+            name_matrix[row_of[area_id]] = tfidf_vector(features, idf)
+
+        expert_sum = np.zeros((len(areas), dim), dtype=np.float32)
+        expert_count = np.zeros(len(areas), dtype=np.float32)
+        expert_vectors = {}
+        for expert_id, area_id in links:
+            if area_id not in row_of or expert_id not in expert_features:
+                continue
+            if expert_id not in expert_vectors:
+                expert_vectors[expert_id] = tfidf_vector(expert_features[expert_id], idf)
+            expert_sum[row_of[area_id]] += expert_vectors[expert_id]
+            expert_count[row_of[area_id]] += 1
+
+        expert_mean = expert_sum / np.maximum(expert_count, 1)[:, None]
+        area_matrix = AREA_NAME_WEIGHT * name_matrix + expert_mean
+        norms = np.linalg.norm(area_matrix, axis=1, keepdims=True)
+        area_matrix = area_matrix / np.where(norms > 0, norms, 1)
+
+        return cls([name for _, name in areas], area_matrix.astype(np.float32), idf)
+
+    @classmethod
+    def from_catalog(cls, snapshot: CatalogSnapshot, dim: int = VECTOR_DIM) -> "LocalAreaRanker":
+        """
+        Build a ranker from a catalog snapshot.
+        """
+        areas = [(area_id, name) for name, area_id in snapshot.area_ids.items()]
+        experts = {expert_id: e.expert_description for expert_id, e in snapshot.experts.items()}
+        links = [
+            (expert_id, area_id)
+            for area_id, expert_ids in snapshot.area_experts.items()
+            for expert_id in expert_ids
+        ]
+        return cls.build(areas, experts, links, dim)
+
+    def scores(self, text: str) -> np.ndarray:
+        """
+        Cosine similarity of a text to every area.
+        """
+        query = tfidf_vector(hashed_features(text, self.idf.shape[0]), self.idf)
+        return self.area_matrix @ query
+
+    def rank(self, role: str, problem: str) -> Dict[str, int]:
+        """
+        Rate every area for a user, in the same shape the GPT prompt returns.
+
+        Returns:
+            Mapping from area name to a fit percentage (0-100), where the best
+            matching area gets 100
+        """
+        scores = self.scores(f"{role} {problem}")
+        best = float(scores.max()) if scores.size else 0.0
+        if best <= 0:
+            return {name: 0 for name in self.area_names}
+        ratings = np.clip(np.rint(100 * scores / best), 0, 100).astype(int)
+        return dict(zip(self.area_names, ratings.tolist()))
+
+
+class ExpertContactRanker:
+    """
+    Precomputed expert vectors for ranking the contacts of an area.
+
+    Expert texts are short, so their vectors are stored sparse and inverted:
+    `postings[bucket_ptr[b]:bucket_ptr[b + 1]]` are the rows of the experts
+    with a nonzero weight in hash bucket `b`. Scoring a query only touches
+    the postings of its own buckets, and the best experts of an area are
+    picked with a heap, so areas with thousands of experts stay cheap.
+    """
+
+    def __init__(
+        self,
+        expert_ids: np.ndarray,
+        bucket_ptr: np.ndarray,
+        postings: np.ndarray,
+        weights: np.ndarray,
+        area_rows: Dict[int, np.ndarray],
+        idf: np.ndarray,
+    ):
+        self.expert_ids = expert_ids
+        self.bucket_ptr = bucket_ptr
+        self.postings = postings
+        self.weights = weights
+        self.area_rows = area_rows
+        self.idf = idf
+
+    @classmethod
+    def build(
+        cls,
+        experts: Dict[int, str],
+        area_experts: Dict[int, Iterable[int]],
+        dim: int = VECTOR_DIM,
+    ) -> "ExpertContactRanker":
+        """
+        Build a ranker from plain catalog data.
+
+        Args:
+            experts: Expert id to the text the expert is matched on
+            area_experts: Area id to the ids of its experts
+            dim: Number of hash buckets
+        """
+        expert_ids = sorted(experts)
+        features = [hashed_features(experts[expert_id], dim) for expert_id in expert_ids]
+        idf = compute_idf(features, dim)
+
+        rows, buckets, weights = [], [], []
+        for row, counts in enumerate(features):
+            if not counts:
+                continue
+            expert_buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tf = 1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            rows.append(np.full(len(counts), row, dtype=np.int32))
+            buckets.append(expert_buckets)
+            weights.append(normalize(tf * idf[expert_buckets]))
+
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32)
+        buckets = np.concatenate(buckets) if buckets else np.zeros(0, dtype=np.int64)
+        weights = np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32)
+        order = np.argsort(buckets, kind="stable")
+        bucket_ptr = np.zeros(dim + 1, dtype=np.int64)
+        np.cumsum(np.bincount(buckets, minlength=dim), out=bucket_ptr[1:])
+
+        row_of = {expert_id: row for row, expert_id in enumerate(expert_ids)}
+        area_rows = {
+            area_id: np.array(sorted(row_of[e] for e in ids if e in row_of), dtype=np.int64)
+            for area_id, ids in area_experts.items()
+        }
+        return cls(
+            np.array(expert_ids, dtype=np.int64),
+            bucket_ptr,
+            rows[order],
+            weights[order].astype(np.float32),
+            area_rows,
+            idf,
+        )
+
+    @classmethod
+    def from_catalog(cls, snapshot: CatalogSnapshot, dim: int = VECTOR_DIM) -> "ExpertContactRanker":
+        """
+        Build a ranker from a catalog snapshot, matching experts on their
+        name, description and institution.
+        """
+        experts = {
+            expert_id: " ".join(filter(None, (e.expert_name, e.expert_description, e.expert_institution)))
+            for expert_id, e in snapshot.experts.items()
+        }
+        return cls.build(experts, snapshot.area_experts, dim)
+
+    def scores(self, text: str) -> np.ndarray:
+        """
+        Cosine similarity of a text to every expert, by row.
+
+        Compute once per user and pass to `top_k` for every area.
+        """
+        query = hashed_features(text, self.idf.shape[0])
+        query_buckets = np.fromiter(query.keys(), dtype=np.int64, count=len(query))
+        starts = self.bucket_ptr[query_buckets]
+        lengths = self.bucket_ptr[query_buckets + 1] - starts
+        if not lengths.sum():
+            return np.zeros(len(self.expert_ids), dtype=np.float32)
+        tf = 1 + np.log(np.fromiter(query.values(), dtype=np.float32, count=len(query)))
+        query_weights = normalize(tf * self.idf[query_buckets])
+        postings = np.concatenate([np.arange(s, s + n) for s, n in zip(starts.tolist(), lengths.tolist())])
+        products = self.weights[postings] * np.repeat(query_weights, lengths)
+        return np.bincount(self.postings[postings], weights=products, minlength=len(self.expert_ids))
+
+    def top_k(self, area_id: int, scores: np.ndarray, k: int = 3) -> Tuple[int, List[int]]:
+        """
+        Pick the experts of an area that best match a query.
+
+        Args:
+            area_id: Area to pick from
+            scores: Result of `scores` for the query
+            k: Number of experts to pick
+
+        Returns:
+            (number of experts linked to the area, ids of the best `k`
+            experts, best first; ties go to the lower id)
+        """
+        rows = self.area_rows.get(area_id)
+        if rows is None or not len(rows):
+            return 0, []
+        area_scores = scores[rows]
+        # Experts sharing no word with the query all score 0 and are only needed as filler
+        hits = np.flatnonzero(area_scores > 0)
+        hit_ids = self.expert_ids[rows[hits]]
+        best = heapq.nlargest(k, zip(area_scores[hits].tolist(), (-hit_ids).tolist()))
+        top = [-negated_id for _, negated_id in best]
+        if len(top) < k:
+            misses = rows[area_scores <= 0][:k - len(top)]
+            top.extend(self.expert_ids[misses].tolist())
+        return len(rows), top
@@ -0,0 +1,106 @@
+"""
+Full-text expert search backed by SQLite FTS5.
+
+`experts_fts` mirrors every expert's name, description and institution plus
+the names of its innovation areas, with the expert id as rowid. The table
+is created by a migration and rebuilt by the importers in the same
+transaction as the imported data. Queries are ranked with BM25 (matches in
+the name weigh most), every search term matches as a prefix, and a snippet
+with the matching words highlighted is returned for each hit.
+"""
+import re
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Column weights for bm25(): name, description, institution, areas
+BM25_WEIGHTS = (10.0, 1.0, 3.0, 5.0)
+SNIPPET_TOKENS = 12
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+CREATE_EXPERTS_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS experts_fts USING fts5("
+    "name, description, institution, areas, "
+    # Diacritics-insensitive, with prefix indexes for short type-ahead queries
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+
+def rebuild_expert_search_index(conn: Connection):
+    """
+    Replace the contents of experts_fts with the current experts and areas.
+
+    Runs in the caller's transaction.
+    """
+    conn.execute(text("DELETE FROM experts_fts"))
+    conn.execute(text(
+        "INSERT INTO experts_fts (rowid, name, description, institution, areas) "
+        "SELECT e.expert_id, coalesce(e.expert_name, ''), coalesce(e.expert_description, ''), "
+        "coalesce(e.expert_institution, ''), coalesce(group_concat(ia.innovation_area_name, ', '), '') "
+        "FROM experts e "
+        "LEFT JOIN expert_areas ea ON ea.expert_id = e.expert_id "
+        "LEFT JOIN innovation_areas ia ON ia.innovation_area_id = ea.area_id "
+        "GROUP BY e.expert_id"
+    ))
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term and all terms must match, so
+    user input can never be parsed as FTS5 syntax.
+
+    Returns:
+        The MATCH expression, empty if the query has no words
+    """
+    return " ".join(f'"{term}"*' for term in _TERM_RE.findall(query))
+
+
+def search_experts(conn: Connection, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Search experts by keyword.
+
+    Args:
+        conn: Database connection
+        query: Free text, e.g. "machine learn st.gallen"
+        limit: Maximum number of results
+        offset: Number of results to skip
+
+    Returns:
+        Experts ordered by relevance, with their areas, a highlighted
+        snippet and the BM25 score (lower is better)
+    """
+    match = build_match_query(query)
+    if not match:
+        return []
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    rows = conn.execute(
+        text(
+            "SELECT e.expert_id, e.expert_name, e.expert_institution, e.expert_email, e.expert_website, "
+            "experts_fts.areas, "
+            f"snippet(experts_fts, -1, :start, :end, '…', {SNIPPET_TOKENS}) AS snippet, "
+            f"bm25(experts_fts, {weights}) AS score "
+            "FROM experts_fts JOIN experts e ON e.expert_id = experts_fts.rowid "
+            "WHERE experts_fts MATCH :match "
+            "ORDER BY score LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "start": HIGHLIGHT_START, "end": HIGHLIGHT_END, "limit": limit, "offset": offset},
+    )
+    return [
+        {
+            "id": row.expert_id,
+            "name": row.expert_name,
+            "institution": row.expert_institution,
+            "email": row.expert_email,
+            "website": row.expert_website,
+            "areas": [a for a in row.areas.split(", ") if a],
+            "snippet": row.snippet,
+            "score": row.score,
+        }
+        for row in rows
+    ]
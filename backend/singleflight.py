@@ -0,0 +1,98 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+When many requests need the same expensive result at the same moment (a
+workshop sending the same template problem to /init), only the first one
+starts the computation; the others wait for it and share its result or its
+exception. The computation is reference counted: a caller that goes away
+stops waiting without affecting the others, and the computation is only
+cancelled once nobody is waiting for it anymore.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from starlette.requests import Request
+
+from llm import ClientDisconnectedError, wait_for_disconnect
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time.
+
+    Results are not kept once the computation finished; combine with a
+    cache for that.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        request: Optional[Request] = None,
+    ) -> Any:
+        """
+        Return the result of `fn()`, sharing a computation already in flight for `key`.
+
+        Args:
+            key: Identifies identical computations
+            fn: Coroutine function that computes the result
+            request: Incoming request; this caller stops waiting if its client disconnects
+
+        Raises:
+            Whatever the shared computation raised
+            ClientDisconnectedError: If the client disconnected while waiting
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            if request is None:
+                # shield: cancelling this caller must not cancel the shared task
+                return await asyncio.shield(flight.task)
+            watcher = asyncio.ensure_future(wait_for_disconnect(request))
+            try:
+                await asyncio.wait({flight.task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                watcher.cancel()
+            if not flight.task.done():
+                raise ClientDisconnectedError()
+            return flight.task.result()
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Nobody may be left to retrieve the exception of a cancelled flight
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,153 @@
+"""
+Opt-in per-request SQL profiling with N+1 detection.
+
+With SQL_PROFILE=1 every statement executed while handling a request is
+counted and timed. Statements are reduced to their shape (literals and
+expanded IN lists collapsed), and a request that runs the same shape more
+than SQL_PROFILE_REPEAT_THRESHOLD times is flagged as a likely query-per-row
+loop. Results are added to the response headers:
+
+    X-SQL-Queries: 4
+    X-SQL-Time-Ms: 1.92
+    X-SQL-Repeated: 1
+
+and flagged requests are logged with the offending statement shapes.
+`profile_queries()` gives scripts and tests the same numbers for any block
+of code.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_PROFILE = os.getenv("SQL_PROFILE", "0") == "1"
+SQL_PROFILE_REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILE_REPEAT_THRESHOLD", "5"))
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Profile of the request (or profile_queries block) currently running
+_current_profile: ContextVar[Optional["QueryProfile"]] = ContextVar("sql_profile", default=None)
+_instrumented: Set[int] = set()
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Shape of a SQL statement: literals become "?" and IN lists "(?...)", so
+    the same query with different values maps to the same fingerprint.
+    """
+    shape = _STRING_RE.sub("?", statement)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _IN_LIST_RE.sub("(?...)", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+class QueryProfile:
+    """
+    Statement count, total time and per-shape counts of one unit of work.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        shape = fingerprint(statement)
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.shapes[shape] += 1
+
+    def repeated(self, threshold: int = SQL_PROFILE_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """
+        Statement shapes that ran more than `threshold` times, most frequent first.
+        """
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+
+@contextmanager
+def profile_queries() -> Iterator[QueryProfile]:
+    """
+    Profile the statements run inside the block on instrumented engines.
+
+        with profile_queries() as profile:
+            get_experts_by_user(db, user_id)
+        assert not profile.repeated()
+    """
+    profile = QueryProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def instrument_engine(engine: Engine):
+    """
+    Record statements of an engine into the active profile. Statements run
+    outside a profiled request cost one context variable lookup.
+    """
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info.setdefault("sql_profile_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        if profile is not None:
+            started = conn.info["sql_profile_start"].pop()
+            profile.record(statement, time.perf_counter() - started)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class SQLProfilerMiddleware:
+    """
+    ASGI middleware that profiles every HTTP request.
+
+    Headers reflect the statements run before the response started; the log
+    line for flagged requests also covers statements run while streaming.
+    """
+
+    def __init__(self, app, threshold: int = SQL_PROFILE_REPEAT_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-sql-queries", str(profile.count).encode()),
+                    (b"x-sql-time-ms", f"{profile.seconds * 1000:.2f}".encode()),
+                    (b"x-sql-repeated", str(len(profile.repeated(self.threshold))).encode()),
+                ]
+            await send(message)
+
+        with profile_queries() as profile:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                for shape, n in profile.repeated(self.threshold):
+                    print(
+                        f"SQL profile: {scope['method']} {scope['path']} ran {n}x "
+                        f"(of {profile.count} statements): {shape[:300]}"
+                    )
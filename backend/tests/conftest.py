@@ -0,0 +1,50 @@
+"""
+Shared setup for the backend tests.
+
+The tests run against a throwaway database, seeded from the bundled CSV, in
+the SQLite mode gunicorn.conf.py deploys with. The LLM is the offline stub.
+createDB reads its settings when it is imported, so they are set here first.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_CSV = os.path.join(BACKEND_DIR, "START Hack 25_Canton of St.Gallen_dataset innovation ecosystem_enriched_new.csv")
+
+db_dir = tempfile.mkdtemp(prefix="backend_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'test.db')}"
+os.environ["SQLITE_MODE"] = "production"
+os.environ["LLM_BACKEND"] = "stub"
+os.environ.pop("OPENAI_API_KEY", None)
+sys.path.insert(0, BACKEND_DIR)
+
+import pytest  # noqa: E402
+
+from createDB import SessionLocal, init_db  # noqa: E402
+from import_innovation_data import import_innovation_data_bulk  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def engines():
+    """
+    (engine, read_engine) of the migrated and seeded test database.
+    """
+    engines = init_db()
+    db = SessionLocal()
+    try:
+        import_innovation_data_bulk(db, SEED_CSV)
+    finally:
+        db.close()
+    return engines
+
+
+@pytest.fixture
+def client(engines):
+    from fastapi.testclient import TestClient
+
+    from app import app
+
+    # The lifespan is not run; the database is ready and shutting down would
+    # stop the shared db_writer
+    return TestClient(app)
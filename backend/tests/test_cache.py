@@ -0,0 +1,57 @@
+"""
+The persistent score cache tier: batched eviction and access tracking.
+"""
+import asyncio
+
+from cache import SQLiteCache, TieredCache, TTLCache
+from migrations import is_table_scan
+
+
+def make_cache(tmp_path, **kwargs):
+    return SQLiteCache(str(tmp_path / "cache.db"), table="scores", **kwargs)
+
+
+def test_evicts_every_n_sets(tmp_path):
+    cache = make_cache(tmp_path, maxsize=5, ttl=60, evict_every=4)
+    for i in range(7):
+        cache.set(f"k{i}", i)
+    # Over maxsize until the next eviction at the 8th set
+    assert len(cache) == 7
+    cache.set("k7", 7)
+    assert len(cache) == 5
+    assert cache.stats()["evictions"] == 3
+    assert cache.get("k0") is None
+    assert cache.get("k7") == 7
+
+
+def test_hits_are_written_before_eviction(tmp_path):
+    cache = make_cache(tmp_path, maxsize=2, ttl=60, evict_every=3)
+    cache.set("old", 1)
+    cache.set("new", 2)
+    assert cache.get("old") == 1
+    # Only the eviction writes accessed_at
+    accessed = dict(cache._conn.execute("SELECT key, accessed_at FROM scores"))
+    assert accessed["old"] < accessed["new"]
+    cache.set("newest", 3)
+    assert cache.get("old") == 1
+    assert cache.get("new") is None
+
+
+def test_expired_entries_are_found_by_index(tmp_path):
+    cache = make_cache(tmp_path, maxsize=5, ttl=60)
+    cache.set("k", 1)
+    plan = [row[-1] for row in cache._conn.execute("EXPLAIN QUERY PLAN DELETE FROM scores WHERE expires_at < 0")]
+    assert not [detail for detail in plan if is_table_scan(detail)], plan
+
+
+def test_tiered_async_access(tmp_path):
+    persistent = make_cache(tmp_path, maxsize=5, ttl=60)
+    cache = TieredCache(TTLCache(maxsize=5, ttl=60), persistent)
+
+    async def roundtrip():
+        await cache.aset("k", {"area": 1})
+        cache.memory.clear()
+        return await cache.aget("k")
+
+    assert asyncio.run(roundtrip()) == {"area": 1}
+    assert cache.memory.get("k") == {"area": 1}
@@ -0,0 +1,77 @@
+"""
+/init must fetch its contacts with a fixed number of statements, not one
+query per area and expert (N+1).
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event, select
+
+import app
+from createDB import ExpertAreas, Experts, InnovationAreas, ReadSessionLocal, get_top_experts_by_area
+
+PARAMS = {
+    "role": "CEO",
+    "problem": "We need AI and machine learning for our production data",
+    "clue": 1,
+    "motivation": 2,
+    "confidence": 3,
+}
+
+
+@contextmanager
+def count_statements(engines):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for engine in set(engines):
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for engine in set(engines):
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_init_without_catalog_cache_runs_two_statements(client, engines, monkeypatch):
+    # Answer from SQLite on every request: one query for the area names, one for the contacts
+    monkeypatch.setattr(app, "CATALOG_CACHE", False)
+    monkeypatch.setattr(app, "AREA_RANKER", "llm")
+    monkeypatch.setattr(app, "CONTACT_RANKER", "first")
+
+    client.get("/init", params=PARAMS)  # warm up the area score cache
+    for problem in (PARAMS["problem"], "Sustainable energy and recycling in construction"):
+        with count_statements(engines) as statements:
+            response = client.get("/init", params=dict(PARAMS, problem=problem))
+        assert response.status_code == 200
+        assert len(response.json()) == 3
+        assert all(area["area"]["contacts"] for area in response.json())
+        assert len(statements) == 2, statements
+
+
+def test_top_experts_by_area_is_one_statement(engines):
+    db = ReadSessionLocal()
+    try:
+        area_names = db.execute(select(InnovationAreas.innovation_area_name)).scalars().all()
+        with count_statements(engines) as statements:
+            experts_by_area = get_top_experts_by_area(db, area_names, limit=3)
+        assert len(statements) == 1
+
+        # Same result as looking every area up on its own
+        for area_name in area_names:
+            expert_ids = db.execute(
+                select(ExpertAreas.expert_id)
+                .join(InnovationAreas, InnovationAreas.innovation_area_id == ExpertAreas.area_id)
+                .where(InnovationAreas.innovation_area_name == area_name)
+                .order_by(ExpertAreas.expert_id)
+            ).scalars().all()
+            if not expert_ids:
+                assert area_name not in experts_by_area
+                continue
+            count, experts = experts_by_area[area_name]
+            assert count == len(expert_ids)
+            assert [e.expert_id for e in experts] == expert_ids[:3]
+            assert all(isinstance(e, Experts) for e in experts)
+    finally:
+        db.close()
@@ -0,0 +1,127 @@
+"""
+Invalidations recorded by one process reach the caches of every other one.
+"""
+import time
+
+import pytest
+
+import app
+from createDB import InnovationAreas, SessionLocal, get_last_cache_invalidation_id, record_cache_invalidation
+from invalidations import CATALOG, PRINCIPALS, RETENTION, InvalidationListener, publish_invalidation
+
+
+def publish(cache, key=None):
+    db = SessionLocal()
+    try:
+        publish_invalidation(db, cache, key)
+    finally:
+        db.close()
+
+
+def listener_with_log():
+    listener = InvalidationListener()
+    calls = []
+    listener.on(CATALOG, lambda keys: calls.append((CATALOG, keys)))
+    listener.on(PRINCIPALS, lambda keys: calls.append((PRINCIPALS, keys)))
+    listener.start()
+    return listener, calls
+
+
+def test_other_listener_applies_each_row_once(engines):
+    listener, calls = listener_with_log()
+    publish(PRINCIPALS, "alice")
+    publish(PRINCIPALS, "bob")
+    publish(CATALOG)
+
+    assert listener.catch_up() == 3
+    assert sorted(calls, key=str) == [(CATALOG, None), (PRINCIPALS, {"alice", "bob"})]
+    calls.clear()
+    assert listener.catch_up() == 0
+    assert calls == []
+
+
+def test_failed_handler_is_retried(engines):
+    listener = InvalidationListener()
+    failures = [RuntimeError("database is locked")]
+    applied = []
+
+    def reload(keys):
+        if failures:
+            raise failures.pop()
+        applied.append(keys)
+
+    listener.on(CATALOG, reload)
+    listener.start()
+    publish(CATALOG)
+    with pytest.raises(RuntimeError):
+        listener.catch_up()
+    assert listener.catch_up() == 1
+    assert applied == [None]
+
+
+def test_listener_behind_retention_drops_everything(engines):
+    # E.g. a worker forked from a master that preloaded days ago: rows it
+    # never saw may have been deleted
+    listener, calls = listener_with_log()
+    listener.synced_at = time.time() - RETENTION.total_seconds() - 1
+    listener.catch_up()
+    assert sorted(calls, key=str) == [(CATALOG, None), (PRINCIPALS, None)]
+
+
+def test_catalog_change_from_another_process_reloads_snapshot(engines):
+    app.cache_invalidations.start()
+    app.cache_invalidations.catch_up()
+    version = app.catalog.get().version
+
+    # What the importer does in another process
+    db = SessionLocal()
+    try:
+        db.add(InnovationAreas(innovation_area_name="Invalidation Test Area"))
+        record_cache_invalidation(db, CATALOG)
+        db.commit()
+    finally:
+        db.close()
+    assert "Invalidation Test Area" not in app.catalog.get().area_ids
+
+    app.cache_invalidations.catch_up()
+    assert app.catalog.get().version == version + 1
+    assert "Invalidation Test Area" in app.catalog.get().area_ids
+
+    db = SessionLocal()
+    try:
+        db.query(InnovationAreas).filter(InnovationAreas.innovation_area_name == "Invalidation Test Area").delete()
+        record_cache_invalidation(db, CATALOG)
+        db.commit()
+    finally:
+        db.close()
+    app.cache_invalidations.catch_up()
+    assert "Invalidation Test Area" not in app.catalog.get().area_ids
+
+
+def test_principal_invalidated_by_another_process(engines):
+    app.cache_invalidations.start()
+    app.cache_invalidations.catch_up()
+    app.principal_cache.set("carol", object())
+    app.principal_cache.set("dave", object())
+
+    publish(PRINCIPALS, "carol")
+    app.cache_invalidations.catch_up()
+    assert app.principal_cache.get("carol") is None
+    assert app.principal_cache.get("dave") is not None
+
+
+def test_register_records_no_invalidation(client):
+    db = SessionLocal()
+    try:
+        last_id = get_last_cache_invalidation_id(db)
+    finally:
+        db.close()
+
+    response = client.post("/register", json={"username": "erin", "password": "secret", "email": "erin@example.com"})
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        assert get_last_cache_invalidation_id(db) == last_id
+    finally:
+        db.close()
@@ -0,0 +1,70 @@
+"""
+/metrics sums the counts of every worker process through METRICS_DIR.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from metrics import Counter, Gauge, Histogram, RatioGauge, Registry
+
+
+def exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def make_registry(directory):
+    registry = Registry(str(directory))
+    requests = registry.register(Counter("requests_total", "Requests.", ("route",)))
+    in_flight = registry.register(Gauge("in_flight", "In flight.", ("route",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    hits = {"cache": [3, 4]}
+    registry.register(RatioGauge("hit_ratio", "Hit ratio.", ("cache",), lambda: {(k,): v for k, v in hits.items()}))
+    return registry, requests, in_flight, latency
+
+
+def write_worker(directory, pid, state):
+    with open(os.path.join(directory, f"metrics_{pid}.json"), "w") as f:
+        json.dump(state, f)
+
+
+def test_render_sums_workers(tmp_path):
+    registry, requests, in_flight, latency = make_registry(tmp_path)
+    requests.inc(route="/init")
+    in_flight.inc(route="/init")
+    latency.observe(0.05, route="/init")
+
+    running = {
+        "requests_total": [[["/init"], 2]],
+        "in_flight": [[["/init"], 1]],
+        "latency_seconds": [[["/init"], [[0, 2, 0], 1.0, 2]]],
+        "hit_ratio": [[["cache"], [1, 4]]],
+    }
+    write_worker(tmp_path, os.getppid(), running)
+    write_worker(tmp_path, exited_pid(), {**running, "requests_total": [[["/init"], 5]]})
+
+    text = registry.render()
+    # Counters and histograms include the exited worker
+    assert 'requests_total{route="/init"} 8' in text
+    assert 'latency_seconds_count{route="/init"} 5' in text
+    assert 'latency_seconds_bucket{route="/init",le="0.1"} 1' in text
+    # Gauges only count running workers
+    assert 'in_flight{route="/init"} 2' in text
+    assert 'hit_ratio{cache="cache"} 0.5' in text
+
+
+def test_render_without_directory_is_this_process(tmp_path):
+    registry, requests, _, _ = make_registry(tmp_path)
+    registry.directory = None
+    requests.inc(route="/init")
+    assert 'requests_total{route="/init"} 1' in registry.render()
+    assert not os.listdir(tmp_path)
+
+
+def test_forked_worker_starts_at_zero(tmp_path):
+    registry, requests, _, _ = make_registry(tmp_path)
+    requests.inc(route="/init")
+    registry.reset()
+    assert requests.value(route="/init") == 0
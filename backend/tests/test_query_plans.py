@@ -0,0 +1,20 @@
+"""
+Every hot query must be answered from an index on a migrated database.
+"""
+import pytest
+
+from migrations import HOT_QUERIES, find_table_scans, is_table_scan, query_plan
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(engines, name):
+    engine, _ = engines
+    with engine.connect() as conn:
+        plan = query_plan(conn, HOT_QUERIES[name])
+    assert plan
+    assert not [detail for detail in plan if is_table_scan(detail)], plan
+
+
+def test_find_table_scans_reports_nothing(engines):
+    engine, _ = engines
+    assert find_table_scans(engine) == []
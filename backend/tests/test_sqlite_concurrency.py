@@ -0,0 +1,139 @@
+"""
+Concurrent reads and writes in SQLITE_MODE=production: no "database is
+locked" errors, no failed reads and no lost writes.
+"""
+import asyncio
+import threading
+
+from sqlalchemy import func, select, text
+
+from createDB import SQLITE_MODE, ReadSessionLocal, SessionLocal, User
+from db_writer import SerializedWriter
+
+# A precomputed hash keeps bcrypt out of the test
+HASHED_PASSWORD = "$2b$12$C6UzMDM.H6dfI/f/IKcEeO5FRpXWQ2pZoE1Q1zYw9M0ZpFg0Q5q9W"
+READERS = 4
+WRITES = 300
+WRITE_CONCURRENCY = 8
+
+
+def insert_user(db, username):
+    db.add(User(username=username, hashed_password=HASHED_PASSWORD))
+    db.commit()
+
+
+def count_users(db, prefix):
+    return db.execute(select(func.count()).select_from(User).where(User.username.like(f"{prefix}%"))).scalar()
+
+
+def run_readers(prefix, write):
+    """
+    Run `write()` while reader threads count the users with `prefix`.
+
+    Returns:
+        (read errors, number of reads); every reader also checks that the
+        count it sees never goes down
+    """
+    stop = threading.Event()
+    errors, reads = [], []
+
+    def reader():
+        db = ReadSessionLocal()
+        seen = 0
+        try:
+            while not stop.is_set():
+                try:
+                    count = count_users(db, prefix)
+                    db.rollback()
+                except Exception as e:
+                    errors.append(str(e).splitlines()[0])
+                    db.rollback()
+                    continue
+                if count < seen:
+                    errors.append(f"count went down from {seen} to {count}")
+                seen = count
+                reads.append(count)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(READERS)]
+    for t in threads:
+        t.start()
+    try:
+        write()
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    return errors, len(reads)
+
+
+def assert_all_written(prefix):
+    db = ReadSessionLocal()
+    try:
+        assert count_users(db, prefix) == WRITES
+    finally:
+        db.close()
+
+
+def test_production_mode_uses_wal(engines):
+    engine, read_engine = engines
+    assert SQLITE_MODE == "production"
+    assert read_engine is not engine
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+
+def test_readers_during_serialized_writes(engines):
+    write_errors = []
+
+    async def write_all():
+        writer = SerializedWriter()
+        semaphore = asyncio.Semaphore(WRITE_CONCURRENCY)
+
+        async def one(i):
+            async with semaphore:
+                try:
+                    await writer.submit(insert_user, f"serialized-{i}")
+                except Exception as e:
+                    write_errors.append(str(e).splitlines()[0])
+
+        try:
+            await asyncio.gather(*(one(i) for i in range(WRITES)))
+        finally:
+            writer.shutdown()
+
+    read_errors, reads = run_readers("serialized-", lambda: asyncio.run(write_all()))
+    assert not write_errors
+    assert not read_errors
+    assert reads > 0
+    assert_all_written("serialized-")
+
+
+def test_readers_during_writes_from_several_connections(engines):
+    # What several gunicorn workers, each with its own writer thread, look like to SQLite
+    write_errors = []
+
+    def writer(offset):
+        for i in range(offset, WRITES, WRITE_CONCURRENCY):
+            db = SessionLocal()
+            try:
+                insert_user(db, f"direct-{i}")
+            except Exception as e:
+                write_errors.append(str(e).splitlines()[0])
+                db.rollback()
+            finally:
+                db.close()
+
+    def write_all():
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(WRITE_CONCURRENCY)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    read_errors, reads = run_readers("direct-", write_all)
+    assert not write_errors
+    assert not read_errors
+    assert reads > 0
+    assert_all_written("direct-")
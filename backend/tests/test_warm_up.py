@@ -0,0 +1,80 @@
+"""
+Requests served while warm-up is still running neither block the event loop
+nor build the rankers a second time.
+"""
+import asyncio
+import threading
+import time
+
+import app
+import ranking
+from catalog import CatalogCache
+
+
+def test_concurrent_ranker_builds_run_once(engines, monkeypatch):
+    snapshot = app.catalog.get()
+    builds = []
+    from_catalog = ranking.ExpertContactRanker.from_catalog
+
+    def slow_from_catalog(snapshot):
+        builds.append(snapshot.version)
+        time.sleep(0.1)
+        return from_catalog(snapshot)
+
+    monkeypatch.setattr(ranking.ExpertContactRanker, "from_catalog", staticmethod(slow_from_catalog))
+    monkeypatch.setattr(app, "contact_ranker", None)
+    monkeypatch.setattr(app, "contact_ranker_version", None)
+    rankers = []
+    threads = [threading.Thread(target=lambda: rankers.append(app.get_contact_ranker(snapshot))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert builds == [snapshot.version]
+    assert len({id(r) for r in rankers}) == 1
+
+
+def test_cold_init_snapshot_loads_off_the_event_loop(engines, monkeypatch):
+    monkeypatch.setattr(app, "catalog", CatalogCache())
+    monkeypatch.setattr(app, "CONTACT_RANKER", "relevance")
+    monkeypatch.setattr(app, "contact_ranker", None)
+    monkeypatch.setattr(app, "contact_ranker_version", None)
+    loaded_in = []
+    load = app.catalog._load
+
+    def record_thread(*args, **kwargs):
+        loaded_in.append(threading.get_ident())
+        return load(*args, **kwargs)
+
+    monkeypatch.setattr(app.catalog, "_load", record_thread)
+
+    async def get():
+        return threading.get_ident(), await app.get_ready_init_snapshot()
+
+    loop_thread, snapshot = asyncio.run(get())
+    assert snapshot is not None
+    assert loaded_in and loop_thread not in loaded_in
+    assert app.contact_ranker_version == snapshot.version
+    assert app.init_snapshot_loaded()
+
+
+def test_lifespan_starts_and_stops_background_tasks(engines, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    stopped = []
+
+    async def close_llm_gateway():
+        stopped.append("llm")
+
+    monkeypatch.setattr(app, "close_llm_gateway", close_llm_gateway)
+    monkeypatch.setattr(app, "stop_db_writer", lambda: stopped.append("db_writer"))
+    with TestClient(app.create_app()) as client:
+        for _ in range(100):
+            if client.get("/ready").status_code == 200:
+                break
+            time.sleep(0.05)
+        assert client.get("/ready").status_code == 200
+        listener = app.invalidation_task
+        assert not listener.done()
+    assert listener.cancelled()
+    assert stopped == ["llm", "db_writer"]
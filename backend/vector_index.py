@@ -0,0 +1,416 @@
+"""
+Memory-mapped on-disk vector index of experts and areas.
+
+The rankers in `ranking.py` vectorize the whole catalog in every worker at
+startup. This module moves that work into a build step that runs after
+`import_innovation_data.py` and writes dense embeddings to disk:
+
+    python vector_index.py --output vector_index [--dim 256] [--int8]
+
+Embeddings are the hashed TF-IDF vectors of `ranking.py`, reduced to `dim`
+dimensions with a fixed random projection (cosine similarity is preserved
+approximately). Every build is written to a new version directory next to
+the previous one, and `CURRENT` is switched to it atomically:
+
+    vector_index/
+        CURRENT                  name of the current version, e.g. "v3"
+        v3/meta.json             format, dimensions, area names, catalog fingerprint
+        v3/expert_ids.npy        id map: row -> expert id, ascending
+        v3/experts.npy           float32 (or int8) matrix, one row per expert
+        v3/expert_scales.npy     per-row scale of the int8 matrix
+        v3/area_ids.npy          area ids, one per row of areas.npy
+        v3/areas.npy             float32 matrix, one row per area
+        v3/area_ptr.npy          area_rows[area_ptr[a]:area_ptr[a + 1]] are
+        v3/area_rows.npy             the expert rows of area a
+        v3/idf.npy, projection.npy   what queries are embedded with
+
+Workers open the arrays with `np.load(mmap_mode="r")`, so nothing is copied
+into the process and all workers on a machine share the page cache.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from catalog import CatalogSnapshot
+from ranking import AREA_NAME_WEIGHT, VECTOR_DIM, hashed_features, idf_from_document_frequency, normalize
+
+FORMAT_VERSION = 1
+DEFAULT_DIM = 256
+PROJECTION_SEED = 20250321
+# Experts embedded per step of the build
+BUILD_CHUNK = 4096
+# Rows multiplied per step of a scan; blocks that fit the CPU cache keep the
+# int8 -> float32 conversion from becoming memory bound
+SCAN_CHUNK = 4096
+# Versions kept on disk; workers that have not reloaded yet may still map the previous one
+KEEP_VERSIONS = 2
+
+
+def projection_matrix(hash_dim: int, dim: int, seed: int = PROJECTION_SEED) -> np.ndarray:
+    """
+    Gaussian random projection from hash buckets to `dim` dimensions.
+    """
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal((hash_dim, dim), dtype=np.float32) / math.sqrt(dim)).astype(np.float32)
+
+
+def embed_features(features: Counter, idf: np.ndarray, projection: np.ndarray) -> np.ndarray:
+    """
+    Project the L2-normalized TF-IDF vector of hashed features.
+
+    The result is not normalized again, so projected vectors can be averaged
+    like the hashed ones.
+    """
+    if not features:
+        return np.zeros(projection.shape[1], dtype=np.float32)
+    buckets = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+    tf = 1 + np.log(np.fromiter(features.values(), dtype=np.float32, count=len(features)))
+    return normalize(tf * idf[buckets]) @ projection[buckets]
+
+
+def quantize_rows(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric int8 quantization with one scale per row.
+
+    Returns:
+        (int8 matrix, float32 scales), where matrix ≈ int8 * scales[:, None]
+    """
+    peak = np.abs(matrix).max(axis=1)
+    scales = np.where(peak > 0, peak / 127, 1).astype(np.float32)
+    return np.rint(matrix / scales[:, None]).astype(np.int8), scales
+
+
+def _expert_text(expert) -> str:
+    return " ".join(filter(None, (expert.expert_name, expert.expert_description, expert.expert_institution)))
+
+
+def _hashed_feature_arrays(texts: Iterable[str], hash_dim: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hashed features of many texts, packed into flat arrays.
+
+    A Counter per expert would not fit in memory for large catalogs.
+
+    Returns:
+        (ptr, buckets, counts), where the features of text i are
+        buckets[ptr[i]:ptr[i + 1]] with their counts
+    """
+    ptr, buckets, counts = array("q", [0]), array("i"), array("i")
+    for text in texts:
+        features = hashed_features(text, hash_dim)
+        buckets.extend(features.keys())
+        counts.extend(features.values())
+        ptr.append(len(buckets))
+    return (
+        np.frombuffer(ptr, dtype=np.int64),
+        np.frombuffer(buckets, dtype=np.int32),
+        np.frombuffer(counts, dtype=np.int32),
+    )
+
+
+def _embed_rows(
+    ptr: np.ndarray,
+    buckets: np.ndarray,
+    counts: np.ndarray,
+    start: int,
+    end: int,
+    idf: np.ndarray,
+    projection: np.ndarray,
+) -> np.ndarray:
+    """
+    embed_features for the texts start to end of packed feature arrays.
+    """
+    lengths = np.diff(ptr[start:end + 1])
+    segment = np.repeat(np.arange(end - start), lengths)
+    chunk_buckets = buckets[ptr[start]:ptr[end]]
+    weights = (1 + np.log(counts[ptr[start]:ptr[end]].astype(np.float32))) * idf[chunk_buckets]
+    norms = np.sqrt(np.bincount(segment, weights=weights * weights, minlength=end - start))
+    weights /= np.where(norms > 0, norms, 1)[segment]
+    tfidf = np.zeros((end - start, projection.shape[0]), dtype=np.float32)
+    tfidf[segment, chunk_buckets] = weights
+    return tfidf @ projection
+
+
+def _next_version(root: str) -> int:
+    versions = [int(name[1:]) for name in os.listdir(root) if name.startswith("v") and name[1:].isdigit()]
+    return max(versions, default=0) + 1
+
+
+def _remove_old_versions(root: str, keep: int):
+    versions = sorted(int(name[1:]) for name in os.listdir(root) if name.startswith("v") and name[1:].isdigit())
+    for version in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, f"v{version}"), ignore_errors=True)
+
+
+def build_vector_index(
+    snapshot: CatalogSnapshot,
+    root: str,
+    dim: int = DEFAULT_DIM,
+    quantize: bool = False,
+    hash_dim: int = VECTOR_DIM,
+) -> str:
+    """
+    Embed a catalog and write it as the next version of the index.
+
+    Args:
+        snapshot: Catalog to embed
+        root: Index directory, created if missing
+        dim: Embedding dimensions
+        quantize: Store the expert matrix as int8 (a quarter of the size)
+        hash_dim: Hash buckets of the TF-IDF features
+
+    Returns:
+        Path of the new version directory
+    """
+    os.makedirs(root, exist_ok=True)
+    version = _next_version(root)
+    tmp_dir = os.path.join(root, f".v{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    expert_ids = np.array(sorted(snapshot.experts), dtype=np.int64)
+    ptr, buckets, counts = _hashed_feature_arrays(
+        (_expert_text(snapshot.experts[int(expert_id)]) for expert_id in expert_ids), hash_dim
+    )
+    area_names = list(snapshot.area_ids)
+    name_features = [hashed_features(name, hash_dim) for name in area_names]
+    # Every bucket occurs at most once per text, so counting buckets counts documents
+    df = np.bincount(buckets, minlength=hash_dim).astype(np.float32)
+    for features in name_features:
+        df[list(features)] += 1
+    idf = idf_from_document_frequency(df, len(expert_ids) + len(area_names))
+    projection = projection_matrix(hash_dim, dim)
+
+    # Expert rows of every area, and (expert row, area row) links sorted by
+    # expert row to accumulate the area means while embedding
+    area_rows = []
+    for name in area_names:
+        ids = np.array(snapshot.area_experts.get(snapshot.area_ids[name], ()), dtype=np.int64)
+        rows = np.searchsorted(expert_ids, ids)
+        known = rows < len(expert_ids)
+        known[known] = expert_ids[rows[known]] == ids[known]
+        area_rows.append(np.sort(rows[known]))
+    link_rows = np.concatenate(area_rows) if area_rows else np.zeros(0, dtype=np.int64)
+    link_areas = np.repeat(np.arange(len(area_rows)), [len(rows) for rows in area_rows])
+    order = np.argsort(link_rows, kind="stable")
+    link_rows, link_areas = link_rows[order], link_areas[order]
+
+    def path(name: str) -> str:
+        return os.path.join(tmp_dir, name)
+
+    dtype = np.int8 if quantize else np.float32
+    experts = np.lib.format.open_memmap(path("experts.npy"), mode="w+", dtype=dtype, shape=(len(expert_ids), dim))
+    scales = np.ones(len(expert_ids), dtype=np.float32)
+    area_sum = np.zeros((len(area_names), dim), dtype=np.float32)
+    for start in range(0, len(expert_ids), BUILD_CHUNK):
+        end = min(start + BUILD_CHUNK, len(expert_ids))
+        chunk = _embed_rows(ptr, buckets, counts, start, end, idf, projection)
+        first, last = np.searchsorted(link_rows, [start, end])
+        np.add.at(area_sum, link_areas[first:last], chunk[link_rows[first:last] - start])
+        norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+        chunk = chunk / np.where(norms > 0, norms, 1)
+        if quantize:
+            chunk, scales[start:end] = quantize_rows(chunk)
+        experts[start:end] = chunk
+    experts.flush()
+    del experts
+
+    areas = np.zeros((len(area_names), dim), dtype=np.float32)
+    for row, features in enumerate(name_features):
+        mean = area_sum[row] / max(len(area_rows[row]), 1)
+        areas[row] = normalize(AREA_NAME_WEIGHT * embed_features(features, idf, projection) + mean)
+
+    area_ptr = np.zeros(len(area_rows) + 1, dtype=np.int64)
+    np.cumsum([len(rows) for rows in area_rows], out=area_ptr[1:])
+    np.save(path("expert_ids.npy"), expert_ids)
+    if quantize:
+        np.save(path("expert_scales.npy"), scales)
+    np.save(path("area_ids.npy"), np.array([snapshot.area_ids[name] for name in area_names], dtype=np.int64))
+    np.save(path("areas.npy"), areas)
+    np.save(path("area_ptr.npy"), area_ptr)
+    np.save(path("area_rows.npy"), np.concatenate(area_rows + [np.zeros(0, dtype=np.int64)]).astype(np.int32))
+    np.save(path("idf.npy"), idf)
+    np.save(path("projection.npy"), projection)
+    with open(path("meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "version": version,
+            "dim": dim,
+            "hash_dim": hash_dim,
+            "quantized": quantize,
+            "experts": len(expert_ids),
+            "area_names": area_names,
+            "catalog_fingerprint": snapshot.fingerprint,
+            "built_at": time.time(),
+        }, f, ensure_ascii=False)
+
+    version_dir = os.path.join(root, f"v{version}")
+    os.rename(tmp_dir, version_dir)
+    current_tmp = os.path.join(root, "CURRENT.tmp")
+    with open(current_tmp, "w") as f:
+        f.write(f"v{version}")
+    os.replace(current_tmp, os.path.join(root, "CURRENT"))
+    _remove_old_versions(root, KEEP_VERSIONS)
+    return version_dir
+
+
+class VectorIndex:
+    """
+    Read-only view of one version of the index, backed by memory maps.
+
+    Offers the same queries as the local rankers: `rank` rates all areas and
+    `area_top_k` picks the best experts of an area.
+    """
+
+    def __init__(self, version_dir: str):
+        with open(os.path.join(version_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector index format {self.meta.get('format')} in {version_dir}")
+        self.version_dir = version_dir
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(version_dir, name), mmap_mode="r")
+
+        self.expert_ids = load("expert_ids.npy")
+        self.experts = load("experts.npy")
+        self.expert_scales = load("expert_scales.npy") if self.meta["quantized"] else None
+        self.areas = load("areas.npy")
+        self.area_ptr = load("area_ptr.npy")
+        self.area_rows = load("area_rows.npy")
+        self.idf = load("idf.npy")
+        self.projection = load("projection.npy")
+        self.area_names: List[str] = self.meta["area_names"]
+        self.area_row_of = {int(area_id): row for row, area_id in enumerate(load("area_ids.npy"))}
+
+    @classmethod
+    def open(cls, root: str) -> "VectorIndex":
+        """
+        Open the current version of the index in `root`.
+
+        Raises:
+            FileNotFoundError: If no index was built there
+        """
+        with open(os.path.join(root, "CURRENT"), encoding="utf-8") as f:
+            return cls(os.path.join(root, f.read().strip()))
+
+    @property
+    def version(self) -> int:
+        return self.meta["version"]
+
+    def is_stale(self, snapshot: CatalogSnapshot) -> bool:
+        """
+        Whether the catalog changed since the index was built.
+        """
+        return (
+            self.meta["catalog_fingerprint"] != snapshot.fingerprint
+            or self.meta["experts"] != len(snapshot.experts)
+        )
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a query text like the experts were embedded.
+        """
+        features = hashed_features(text, self.meta["hash_dim"])
+        return normalize(embed_features(features, self.idf, self.projection))
+
+    def expert_scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cosine similarity of a query embedding to experts.
+
+        Args:
+            query: Result of `embed`
+            rows: Expert rows to score, all experts if omitted
+
+        Returns:
+            One score per row (per expert if `rows` is omitted)
+        """
+        count = len(self.expert_ids) if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SCAN_CHUNK):
+            selected = slice(start, start + SCAN_CHUNK) if rows is None else rows[start:start + SCAN_CHUNK]
+            block = self.experts[selected]
+            if self.expert_scales is None:
+                scores[start:start + len(block)] = block @ query
+            else:
+                scores[start:start + len(block)] = (block.astype(np.float32) @ query) * self.expert_scales[selected]
+        return scores
+
+    def nearest(self, query: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        The `k` experts most similar to a query embedding.
+
+        Returns:
+            (expert id, score) pairs, best first; ties go to the lower id
+        """
+        scores = self.expert_scores(query, rows)
+        if rows is None:
+            rows = np.arange(len(scores))
+        if len(scores) > k:
+            # Keep everything tied with the k-th best, so ties resolve by id below
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            candidates = np.flatnonzero(scores >= kth)
+        else:
+            candidates = np.arange(len(scores))
+        ids = self.expert_ids[rows[candidates]]
+        order = np.lexsort((ids, -scores[candidates]))[:k]
+        return [(int(ids[i]), float(scores[candidates][i])) for i in order]
+
+    def area_top_k(self, area_id: int, query: np.ndarray, k: int = 3) -> Tuple[int, List[int]]:
+        """
+        Pick the experts of an area that best match a query embedding.
+
+        Returns:
+            (number of experts linked to the area, ids of the best `k`
+            experts, best first)
+        """
+        row = self.area_row_of.get(area_id)
+        if row is None:
+            return 0, []
+        rows = np.asarray(self.area_rows[self.area_ptr[row]:self.area_ptr[row + 1]], dtype=np.int64)
+        if not len(rows):
+            return 0, []
+        return len(rows), [expert_id for expert_id, _ in self.nearest(query, k, rows)]
+
+    def rank(self, role: str, problem: str) -> Dict[str, int]:
+        """
+        Rate every area for a user, like LocalAreaRanker.rank.
+        """
+        scores = self.areas @ self.embed(f"{role} {problem}")
+        best = float(scores.max()) if scores.size else 0.0
+        if best <= 0:
+            return {name: 0 for name in self.area_names}
+        ratings = np.clip(np.rint(100 * scores / best), 0, 100).astype(int)
+        return dict(zip(self.area_names, ratings.tolist()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped vector index of experts and areas")
+    parser.add_argument("--output", default=os.getenv("VECTOR_INDEX_PATH", "vector_index"), help="Index directory")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM, help="Embedding dimensions")
+    parser.add_argument("--int8", action="store_true", help="Quantize the expert matrix to int8")
+    args = parser.parse_args()
+
+    from catalog import load_catalog
+    from createDB import SessionLocal, record_cache_invalidation
+    from invalidations import CATALOG, RETENTION
+
+    db = SessionLocal()
+    try:
+        snapshot = load_catalog(db, version=0)
+        started = time.perf_counter()
+        version_dir = build_vector_index(snapshot, args.output, dim=args.dim, quantize=args.int8)
+        print(f"Wrote {len(snapshot.experts)} experts and {len(snapshot.area_ids)} areas to {version_dir} "
+              f"in {time.perf_counter() - started:.1f}s")
+        # Running workers reload their catalog, and with it the index, once this commits
+        record_cache_invalidation(db, CATALOG, retention=RETENTION)
+        db.commit()
+    finally:
+        db.close()
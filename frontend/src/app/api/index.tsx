@@ -57,3 +57,93 @@ export const hasValidToken = (): boolean => {
   return expirationDate > new Date();
 };
 
+
+/**
+ * Start a server-side conversation about an /init result. Later turns only
+ * post the new user message to `/conversations/{id}/message`.
+ * Resolves with the conversation id.
+ */
+export const createConversation = async (
+  startData: unknown,
+  messages: { role: string; content: string }[]
+): Promise<string> => {
+  const response = await fetch(`${BASE_URL}/conversations`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ start_data: startData, messages }),
+  });
+
+  if (!response.ok) {
+    throw new Error('Failed to create conversation');
+  }
+
+  const data: { conversation_id: string } = await response.json();
+  return data.conversation_id;
+};
+
+/**
+ * Post a chat turn to a streaming message endpoint and call `onDelta` for
+ * every chunk of text as it arrives. Resolves with the full response once
+ * the `done` event arrives. Throws if the stream cannot be opened, reports an
+ * error or ends before `done`; the server only stores the turn on `done`, so
+ * callers can then fall back to the plain JSON endpoint.
+ */
+export const streamMessage = async (
+  body: unknown,
+  onDelta: (delta: string) => void,
+  path = '/message/stream'
+): Promise<string> => {
+  const response = await fetch(`${BASE_URL}${path}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+    },
+    body: JSON.stringify(body),
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error('Failed to open message stream');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      let data = '';
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'delta') {
+        text += payload.delta;
+        onDelta(payload.delta);
+      } else if (event === 'done') {
+        return payload.response ?? text;
+      } else if (event === 'error') {
+        throw new Error(payload.detail ?? 'Message stream failed');
+      }
+    }
+  }
+
+  throw new Error('Message stream ended before the response was complete');
+};
@@ -12,7 +12,7 @@ import { useStore } from '@/lib/store';
 import { Send } from 'lucide-react';
 
 import { CardContent, CardFooter } from '@/components/ui/card';
-import { BASE_URL } from '@/app/api';
+import { BASE_URL, createConversation, streamMessage } from '@/app/api';
 
 export default function CardsChat() {
   const [isLoading, setIsLoading] = React.useState(false);
@@ -45,6 +45,8 @@ export default function CardsChat() {
     return defaultMessages;
   });
   const [input, setInput] = React.useState('');
+  // Server-side conversation, created on the first message
+  const conversationId = React.useRef<string | null>(null);
   const inputLength = input.trim().length;
   // <div className='fixed top-1/2 right-0 transform -translate-y-1/2 z-50 px-4 py-4'>
   //   <div className='bg-card text-card-foreground flex flex-col gap-6 rounded-xl border py-6 shadow-sm w-[350px] h-[80vh]'></div>
@@ -123,20 +125,64 @@ export default function CardsChat() {
               setIsLoading(true);
 
               try {
-                // Call the message endpoint
-                const url = new URL(
-                  `${BASE_URL}/message`,
-                  window.location.origin
-                );
+                // The server keeps the transcript, so only the new message is sent
+                if (!conversationId.current) {
+                  conversationId.current = await createConversation(
+                    graphData,
+                    messages
+                  );
+                }
+                const path = `/conversations/${conversationId.current}/message`;
+                const body = { content: userMessage.content };
+
+                // Stream the answer into a new assistant message as it arrives
+                let streamed = false;
+                try {
+                  const reply = await streamMessage(body, (delta) => {
+                    if (!streamed) {
+                      streamed = true;
+                      setIsLoading(false);
+                      setMessages((prevMessages) => [
+                        ...prevMessages,
+                        { role: 'assistant', content: delta },
+                      ]);
+                      return;
+                    }
+                    setMessages((prevMessages) => {
+                      const last = prevMessages[prevMessages.length - 1];
+                      return [
+                        ...prevMessages.slice(0, -1),
+                        { ...last, content: last.content + delta },
+                      ];
+                    });
+                  }, `${path}?stream=true`);
+                  // The turn is stored once the stream completes, so never
+                  // post it again, even if no text arrived as deltas
+                  if (!streamed) {
+                    setMessages((prevMessages) => [
+                      ...prevMessages,
+                      {
+                        role: 'assistant',
+                        content:
+                          reply || "I'm sorry, I couldn't process your request.",
+                      },
+                    ]);
+                  }
+                  return;
+                } catch (streamError) {
+                  // A partially streamed answer cannot be retried cleanly
+                  if (streamed) throw streamError;
+                  console.warn('Streaming failed, falling back:', streamError);
+                }
+
+                // Fall back to the plain JSON endpoint
+                const url = new URL(`${BASE_URL}${path}`, window.location.origin);
                 const response = await fetch(url, {
                   method: 'POST',
                   headers: {
                     'Content-Type': 'application/json',
                   },
-                  body: JSON.stringify({
-                    last_messages: all_messages,
-                    start_data: graphData,
-                  }),
+                  body: JSON.stringify(body),
                 });
 
                 if (!response.ok) {